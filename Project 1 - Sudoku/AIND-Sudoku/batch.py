@@ -0,0 +1,111 @@
+"""
+Batch solving of many Sudoku grids over a process pool.
+
+    from batch import solve_many
+    for result in solve_many(grids, workers=4, chunksize=64, backend='dlx'):
+        print(result.index, result.seconds, result.values)
+"""
+
+import os
+import time
+from collections import deque, namedtuple
+from itertools import islice
+from multiprocessing import Pool
+
+import solution
+
+SolveResult = namedtuple('SolveResult', ['index', 'grid', 'values', 'seconds', 'error'])
+SolveResult.__doc__ = """
+Outcome of one puzzle of a batch.
+    index: position of the grid in the input
+    grid: the grid string that was solved
+    values: the solved grid in dictionary form, False if it has no solution, None if solving failed
+    seconds: wall time spent in solve()
+    error: None, or a description of the exception raised while solving
+"""
+
+
+def _solve_one(task):
+    """Solve one (index, grid, options) task, turning any exception into an error result."""
+    index, grid, options = task
+    start = time.perf_counter()
+    try:
+        values = solution.solve(grid, **options)
+        error = None
+    except Exception as e:
+        values = None
+        error = '{}: {}'.format(type(e).__name__, e)
+    return SolveResult(index, grid, values, time.perf_counter() - start, error)
+
+
+def _solve_chunk(tasks):
+    return [_solve_one(task) for task in tasks]
+
+
+def _results(grids, workers, chunksize, ordered, options):
+    tasks = ((index, grid, options) for index, grid in enumerate(grids))
+    if workers == 1:
+        for task in tasks:
+            yield _solve_one(task)
+        return
+    with Pool(workers) as pool:
+        if ordered:
+            yield from pool.imap(_solve_one, tasks, chunksize)
+        else:
+            yield from pool.imap_unordered(_solve_one, tasks, chunksize)
+
+
+def solve_many(grids, workers=None, chunksize=16, ordered=True, **options):
+    """
+    Solve many grids, spreading them over a pool of worker processes.
+    A puzzle that raises does not stop the batch: its result carries the error instead.
+    Args:
+        grids(iterable): grid strings in the format accepted by solution.solve()
+        workers(int): number of worker processes, None for one per CPU, 1 to solve in this process
+        chunksize(int): number of grids sent to a worker at a time
+        ordered(bool): True to return a list of results in input order, False to return a
+            generator that yields the results as soon as they are finished
+        **options: keyword arguments passed on to solution.solve(), e.g. backend='dlx'
+    Returns:
+        A list, or a generator, of SolveResult.
+    """
+    if workers is None:
+        workers = os.cpu_count() or 1
+    results = _results(grids, workers, chunksize, ordered, options)
+    if ordered:
+        return list(results)
+    return results
+
+
+def solve_stream(grids, workers=None, chunksize=16, window=None, **options):
+    """
+    Solve a stream of grids in input order, reading only as far ahead as the workers need.
+    Unlike solve_many(), at most window chunks of grids are read and in flight at any time, so
+    an endless or very large input, e.g. a file read line by line, is never held in memory.
+    Args:
+        grids(iterable): grid strings in the format accepted by solution.solve()
+        workers(int): number of worker processes, None for one per CPU, 1 to solve in this process
+        chunksize(int): number of grids sent to a worker at a time
+        window(int): number of chunks in flight, None for four per worker
+        **options: keyword arguments passed on to solution.solve()
+    Returns:
+        A generator of SolveResult in input order.
+    """
+    if workers is None:
+        workers = os.cpu_count() or 1
+    tasks = ((index, grid, options) for index, grid in enumerate(grids))
+    if workers == 1:
+        for task in tasks:
+            yield _solve_one(task)
+        return
+    if window is None:
+        window = 4 * workers
+    chunks = iter(lambda: list(islice(tasks, chunksize)), [])
+    with Pool(workers) as pool:
+        pending = deque()
+        for chunk in chunks:
+            pending.append(pool.apply_async(_solve_chunk, (chunk,)))
+            while len(pending) >= window:
+                yield from pending.popleft().get()
+        while pending:
+            yield from pending.popleft().get()
@@ -0,0 +1,193 @@
+"""
+Benchmark of the solver backends and strategy mixes on locally generated puzzle sets.
+
+    python benchmark.py --count 20 --repeat 3 -o benchmark.json
+
+Every tier is generated from a fixed seed, so two runs time the same puzzles:
+    easy: standard rules, 36 clues, single solution
+    hard: standard rules, no clue can be removed without losing uniqueness, and the
+        plain propagation of reduce_puzzle() stalls before the end, so search() must guess
+    diagonal: diagonal rules, minimal, single solution
+    minimal: standard rules, minimal, single solution
+Full grids and clue removal come from generator.py.
+
+Each configuration solves every puzzle of a tier repeat times. The fastest time of each
+puzzle is kept, and the results are written as JSON: one record per (tier, configuration)
+with the total, mean, median and max times and the number of puzzles solved. Configurations that
+collect statistics also report their total branch points and backtracks, from one more untimed
+solve, to compare the branching policies.
+"""
+
+import argparse
+import json
+import platform
+import random
+import sys
+import time
+
+import bitmask_solver
+import solution
+import vector_solver
+from generator import full_grid, remove_clues
+from topology import get_topology
+
+TIERS = ('easy', 'hard', 'diagonal', 'minimal')
+
+# name -> keyword arguments of solution.solve()
+CONFIGURATIONS = (
+    ('string', {'backend': 'string'}),
+    ('bitmask-sweep', {'backend': 'bitmask'}),
+    ('bitmask-sweep-subsets3', {'backend': 'bitmask', 'subsets': 3}),
+    ('bitmask-worklist', {'backend': 'bitmask', 'propagation': 'worklist'}),
+    ('bitmask-worklist-trail', {'backend': 'bitmask', 'propagation': 'worklist', 'backtracking': 'trail'}),
+    ('bitmask-worklist-trail-subsets3', {'backend': 'bitmask', 'propagation': 'worklist', 'backtracking': 'trail',
+                                         'subsets': 3}),
+    ('bitmask-worklist-trail-degree', {'backend': 'bitmask', 'propagation': 'worklist', 'backtracking': 'trail',
+                                       'select': 'degree'}),
+    ('bitmask-worklist-trail-degree-lcv', {'backend': 'bitmask', 'propagation': 'worklist',
+                                           'backtracking': 'trail', 'select': 'degree', 'order': 'lcv'}),
+    ('bitmask-worklist-trail-degree-frequency', {'backend': 'bitmask', 'propagation': 'worklist',
+                                                 'backtracking': 'trail', 'select': 'degree', 'order': 'frequency'}),
+    ('dlx', {'backend': 'dlx'}),
+)
+
+
+def needs_search(grid, diagonal):
+    """True if the propagation of reduce_puzzle() alone does not solve grid."""
+    topology = get_topology(diagonal)
+    masks = bitmask_solver.reduce_puzzle(bitmask_solver.grid_masks(grid, topology), topology)
+    return masks is not False and any(mask & (mask - 1) for mask in masks)
+
+
+def corpus(tier, count, seed):
+    """
+    Generate the puzzles of a tier.
+    Returns:
+        A tuple (grids, diagonal).
+    """
+    rnd = random.Random('{}-{}'.format(tier, seed))
+    diagonal = tier == 'diagonal'
+    grids = []
+    while len(grids) < count:
+        grid = full_grid(rnd, diagonal)
+        if tier == 'easy':
+            grids.append(remove_clues(grid, rnd, diagonal, keep=36))
+            continue
+        grid = remove_clues(grid, rnd, diagonal)
+        if tier != 'hard' or needs_search(grid, diagonal):
+            grids.append(grid)
+    return grids, diagonal
+
+
+def time_configuration(grids, diagonal, options, repeat):
+    """Solve every grid repeat times. Returns (best time of every grid, number solved)."""
+    times = []
+    solved = 0
+    for grid in grids:
+        best = None
+        for _ in range(repeat):
+            start = time.perf_counter()
+            values = solution.solve(grid, diagonal=diagonal, **options)
+            seconds = time.perf_counter() - start
+            best = seconds if best is None else min(best, seconds)
+        times.append(best)
+        solved += bool(values)
+    return times, solved
+
+
+def time_vector(grids, diagonal, repeat):
+    """Time vector_solver.solve_batch() on the whole tier. Returns (best total time, number solved)."""
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        solved = vector_solver.solve_batch(grids, diagonal)
+        seconds = time.perf_counter() - start
+        best = seconds if best is None else min(best, seconds)
+    return best, sum(1 for values in solved if values)
+
+
+def branch_counts(grids, diagonal, options):
+    """Return the total (branch points, backtracks) of the grids, None for the dlx backend."""
+    if options.get('backend') == 'dlx':
+        return None
+    branch_points = backtracks = 0
+    for grid in grids:
+        values, stats = solution.solve(grid, diagonal=diagonal, stats=True, **options)
+        branch_points += stats.branch_points
+        backtracks += stats.backtracks
+    return branch_points, backtracks
+
+
+def record(tier, name, times, solved, branches=None):
+    ordered = sorted(times)
+    result = {'tier': tier, 'configuration': name, 'puzzles': len(times), 'solved': solved,
+              'total_s': sum(times), 'mean_ms': 1000 * sum(times) / len(times),
+              'median_ms': 1000 * ordered[len(ordered) // 2], 'max_ms': 1000 * ordered[-1]}
+    if branches is not None:
+        result['branch_points'], result['backtracks'] = branches
+    return result
+
+
+def run(tiers=TIERS, count=20, seed=1, repeat=3, configurations=CONFIGURATIONS, log=None):
+    """
+    Generate the tiers and time every configuration on them.
+    Args:
+        tiers(iterable): names from TIERS
+        count(int): puzzles per tier
+        seed(int): seed of the generated tiers
+        repeat(int): solves of every puzzle, the fastest one is kept
+        configurations(iterable): (name, solve() keyword arguments) pairs
+        log(file): if given, progress lines are written to it
+    Returns:
+        A dictionary with the run settings under 'meta' and one record per tier and configuration
+        under 'results'.
+    """
+    results = []
+    for tier in tiers:
+        grids, diagonal = corpus(tier, count, seed)
+        if log:
+            clues = sum(81 - grid.count('.') for grid in grids) / len(grids)
+            print('{}: {} puzzles, {:.1f} clues on average'.format(tier, len(grids), clues), file=log)
+        for name, options in configurations:
+            times, solved = time_configuration(grids, diagonal, options, repeat)
+            results.append(record(tier, name, times, solved, branch_counts(grids, diagonal, options)))
+            if log:
+                line = '  {:<40} {:>10.3f} ms/puzzle'.format(name, results[-1]['mean_ms'])
+                if 'backtracks' in results[-1]:
+                    line += ' {:>8} backtracks'.format(results[-1]['backtracks'])
+                print(line, file=log)
+        if vector_solver.np is not None:
+            seconds, solved = time_vector(grids, diagonal, repeat)
+            # Only the batch total is known, spread it evenly over the puzzles
+            results.append(record(tier, 'vector-batch', [seconds / len(grids)] * len(grids), solved))
+            if log:
+                print('  {:<40} {:>10.3f} ms/puzzle'.format('vector-batch', results[-1]['mean_ms']), file=log)
+    meta = {'python': platform.python_version(), 'machine': platform.machine(), 'tiers': list(tiers),
+            'count': count, 'seed': seed, 'repeat': repeat}
+    return {'meta': meta, 'results': results}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Time the Sudoku solvers on generated puzzle sets.')
+    parser.add_argument('-o', '--output', default='-', help="JSON results file, '-' for stdout (default)")
+    parser.add_argument('--tiers', nargs='+', choices=TIERS, default=list(TIERS))
+    parser.add_argument('--count', type=int, default=20, help='puzzles per tier')
+    parser.add_argument('--seed', type=int, default=1)
+    parser.add_argument('--repeat', type=int, default=3, help='solves per puzzle, the fastest is kept')
+    parser.add_argument('--configurations', nargs='+', choices=[name for name, options in CONFIGURATIONS],
+                        help='configurations to time, all of them by default')
+    args = parser.parse_args(argv)
+
+    configurations = [(name, options) for name, options in CONFIGURATIONS
+                      if args.configurations is None or name in args.configurations]
+    report = run(args.tiers, args.count, args.seed, args.repeat, configurations, log=sys.stderr)
+    if args.output == '-':
+        json.dump(report, sys.stdout, indent=2)
+        print()
+    else:
+        with open(args.output, 'w') as f:
+            json.dump(report, f, indent=2)
+
+
+if __name__ == '__main__':
+    main()
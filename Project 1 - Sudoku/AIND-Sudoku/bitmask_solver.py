@@ -0,0 +1,578 @@
+"""
+Bitmask candidate engine for the Sudoku solver.
+
+Every box is stored as an n-bit integer in a flat list of n*n entries: bit d-1 is
+set while digit d is still a candidate for that box. Units and peers are taken from
+the integer tables of the Topology, so the propagation loops below never build or
+compare strings. The result is converted back to the usual {'A1': '8', ...}
+dictionary only at the very end.
+
+The default topology is the diagonal 9x9 board. The same functions solve 16x16 and
+25x25 boards when given their topology, Python integers being wide enough for any
+number of digits.
+"""
+
+import os
+from functools import lru_cache
+from multiprocessing import Pool
+from time import perf_counter
+
+import branching as branching_policies
+import strategies
+from stats import SolverStats
+from topology import get_topology
+
+
+class _BitCount(object):
+    """Stands in for a popcount lookup table when the table would be too large."""
+
+    def __getitem__(self, mask):
+        return bin(mask).count('1')
+
+
+@lru_cache(maxsize=None)
+def popcount_table(n):
+    """
+    Return a sequence mapping every mask of n digits to its number of candidates.
+    Boards of up to 16 digits get a real lookup table.
+    """
+    if n <= 16:
+        return [bin(m).count('1') for m in range(1 << n)]
+    return _BitCount()
+
+
+# Candidate strings of the 9x9 board, indexed by mask (0..511)
+MASK_STRING = [''.join(d for i, d in enumerate('123456789') if m & (1 << i)) for m in range(1 << 9)]
+
+
+def mask_string(mask, topology):
+    """Return the candidates of a mask as a string of digits, e.g. '137'."""
+    if topology.n == 9:
+        return MASK_STRING[mask]
+    return ''.join(d for i, d in enumerate(topology.digits) if mask >> i & 1)
+
+
+def grid_masks(grid, topology=None):
+    """
+    Convert a grid string into a list of candidate masks.
+    Args:
+        grid(string): A grid in string form, '.' for empty boxes.
+        topology(Topology): the board topology, the diagonal 9x9 one if None
+    Returns:
+        A list of n*n ints, all digits set for the empty boxes.
+    """
+    if topology is None:
+        topology = get_topology()
+    assert len(grid) == topology.n * topology.n
+    all_digits = (1 << topology.n) - 1
+    digit_mask = dict((d, 1 << i) for i, d in enumerate(topology.digits))
+    return [all_digits if value == '.' else digit_mask[value] for value in grid]
+
+
+def values_masks(values, topology=None):
+    """Convert a values dictionary {'A1': '123', ...} into a list of candidate masks."""
+    if topology is None:
+        topology = get_topology()
+    digit_mask = dict((d, 1 << i) for i, d in enumerate(topology.digits))
+    masks = []
+    for box in topology.boxes:
+        mask = 0
+        for digit in values[box]:
+            mask |= digit_mask[digit]
+        masks.append(mask)
+    return masks
+
+
+def masks_values(masks, topology=None):
+    """Convert a list of candidate masks back into the values dictionary format."""
+    if topology is None:
+        topology = get_topology()
+    return dict(zip(topology.boxes, [mask_string(mask, topology) for mask in masks]))
+
+
+def _counter(masks, popcount):
+    """Return a function counting the (candidates, solved boxes) of masks, for SolverStats.run()."""
+    def count():
+        return sum(popcount[mask] for mask in masks), sum(1 for mask in masks if popcount[mask] == 1)
+    return count
+
+
+def eliminate(masks, topology):
+    """
+    Remove the digit of every solved box from all of its peers.
+    Args:
+        masks(list): the candidate masks, changed in place
+        topology(Topology): the board topology
+    Returns:
+        The masks list.
+    """
+    popcount = popcount_table(topology.n)
+    peers = topology.index_peers
+    for box in range(len(masks)):
+        mask = masks[box]
+        if popcount[mask] == 1:
+            keep = ~mask
+            for peer in peers[box]:
+                masks[peer] &= keep
+    return masks
+
+
+def naked_twins(masks, topology):
+    """
+    Remove the digits of every naked twin pair from the other boxes of its unit.
+    Args:
+        masks(list): the candidate masks, changed in place
+        topology(Topology): the board topology
+    Returns:
+        The masks list.
+    """
+    popcount = popcount_table(topology.n)
+    for unit in topology.index_units:
+        seen = {}
+        for box in unit:
+            mask = masks[box]
+            if popcount[mask] != 2:
+                continue
+            twin = seen.get(mask)
+            if twin is None:
+                seen[mask] = box
+                continue
+            keep = ~mask
+            for other in unit:
+                if other != box and other != twin:
+                    masks[other] &= keep
+    return masks
+
+
+def only_choice(masks, topology):
+    """
+    Assign every digit that fits in only one box of a unit to that box.
+    Args:
+        masks(list): the candidate masks, changed in place
+        topology(Topology): the board topology
+    Returns:
+        The masks list.
+    """
+    for unit in topology.index_units:
+        once = twice = 0
+        for box in unit:
+            mask = masks[box]
+            twice |= once & mask
+            once |= mask
+        singles = once & ~twice
+        while singles:
+            bit = singles & -singles
+            singles ^= bit
+            for box in unit:
+                if masks[box] & bit:
+                    masks[box] = bit
+                    break
+    return masks
+
+
+def _subsets_pass(masks, topology, subsets, popcount):
+    """Apply strategies.subsets() to every unit. Returns False on a contradiction."""
+    for unit in topology.index_units:
+        if strategies.subsets(masks, unit, subsets, popcount=popcount) is False:
+            return False
+    return masks
+
+
+def reduce_puzzle(masks, topology, subsets=None, stats=None):
+    """
+    Apply eliminate(), naked_twins() and only_choice() until they stop changing the masks.
+    Args:
+        masks(list): the candidate masks, changed in place
+        topology(Topology): the board topology
+        subsets(int): if given, also apply the naked and hidden subsets of sizes 2 to subsets
+            from strategies.py to every unit
+        stats(SolverStats): if given, the calls, effect and time of every strategy are added to it
+    Returns:
+        The masks list, or False if a box ran out of candidates.
+    """
+    popcount = popcount_table(topology.n)
+    if stats is not None:
+        count = _counter(masks, popcount)
+    stalled = False
+    while not stalled:
+        before = list(masks)
+        if stats is None:
+            eliminate(masks, topology)
+            naked_twins(masks, topology)
+            only_choice(masks, topology)
+        else:
+            stats.run('eliminate', count, eliminate, masks, topology)
+            stats.run('naked_twins', count, naked_twins, masks, topology)
+            stats.run('only_choice', count, only_choice, masks, topology)
+        if 0 in masks:
+            return False
+        if subsets:
+            if stats is None:
+                found = _subsets_pass(masks, topology, subsets, popcount)
+            else:
+                found = stats.run('subsets', count, _subsets_pass, masks, topology, subsets, popcount)
+            if found is False:
+                return False
+        stalled = masks == before
+    return masks
+
+
+def propagate(masks, topology, changed, trail=None, subsets=None):
+    """
+    Worklist version of reduce_puzzle(). Only the boxes that changed are revisited: a solved
+    box removes its digit from its peers, and every unit that contains a changed box is
+    checked for hidden singles and naked twins. Propagation stops at the first contradiction.
+    Args:
+        masks(list): the candidate masks, changed in place
+        topology(Topology): the board topology
+        changed(iterable): indices of the boxes that changed since the last propagation
+        trail(Trail): if given, every change is recorded on it so that it can be undone
+        subsets(int): if given, dirty units are also checked for the naked and hidden subsets
+            of sizes 2 to subsets from strategies.py
+    Returns:
+        The masks list, or False if the puzzle has no solution.
+    """
+    unit_list, peers, box_units = topology.index_units, topology.index_peers, topology.box_units
+    popcount = popcount_table(topology.n)
+    all_digits = (1 << topology.n) - 1
+    work = list(changed)
+    queued = set(work)
+    dirty = set()
+    while work or dirty:
+        while work:
+            box = work.pop()
+            queued.discard(box)
+            mask = masks[box]
+            if not mask:
+                return False
+            dirty.update(box_units[box])
+            if popcount[mask] != 1:
+                continue
+            keep = ~mask
+            for peer in peers[box]:
+                peer_mask = masks[peer]
+                if peer_mask & mask:
+                    if trail is not None:
+                        trail.append((peer, peer_mask))
+                    peer_mask &= keep
+                    if not peer_mask:
+                        return False
+                    masks[peer] = peer_mask
+                    if peer not in queued:
+                        queued.add(peer)
+                        work.append(peer)
+        if not dirty:
+            break
+        unit = unit_list[dirty.pop()]
+
+        # Hidden singles: a digit that fits in only one box of the unit
+        once = twice = 0
+        for box in unit:
+            mask = masks[box]
+            twice |= once & mask
+            once |= mask
+        if once != all_digits:
+            return False
+        singles = once & ~twice
+        while singles:
+            bit = singles & -singles
+            singles ^= bit
+            for box in unit:
+                if masks[box] & bit:
+                    if masks[box] != bit:
+                        if trail is not None:
+                            trail.append((box, masks[box]))
+                        masks[box] = bit
+                        if box not in queued:
+                            queued.add(box)
+                            work.append(box)
+                    break
+
+        # Naked twins: two boxes of the unit sharing the same two candidates
+        seen = {}
+        for box in unit:
+            mask = masks[box]
+            if popcount[mask] != 2:
+                continue
+            twin = seen.get(mask)
+            if twin is None:
+                seen[mask] = box
+                continue
+            if twin == -1:
+                return False
+            seen[mask] = -1
+            keep = ~mask
+            for other in unit:
+                if other != box and other != twin and masks[other] & mask:
+                    if trail is not None:
+                        trail.append((other, masks[other]))
+                    masks[other] &= keep
+                    if other not in queued:
+                        queued.add(other)
+                        work.append(other)
+
+        if subsets:
+            found = strategies.subsets(masks, unit, subsets, trail, popcount)
+            if found is False:
+                return False
+            for box in found:
+                if box not in queued:
+                    queued.add(box)
+                    work.append(box)
+    return masks
+
+
+def search(masks, topology, propagation='sweep', changed=None, subsets=None, stats=None, depth=0, branching=None,
+           open_boxes=None):
+    """
+    Reduce the puzzle and branch on the box chosen by the branching policy until it is solved.
+    Args:
+        masks(list): the candidate masks
+        topology(Topology): the board topology
+        propagation(string): 'sweep' to run reduce_puzzle() over the whole board, 'worklist'
+            to run propagate() on the boxes that changed only
+        changed(iterable): the boxes that changed since the last propagation, used by the
+            'worklist' mode. None means every box.
+        subsets(int): largest naked and hidden subsets to propagate, None for naked twins only
+        stats(SolverStats): if given, strategy and branching statistics are added to it
+        depth(int): the number of guesses made above this call
+        branching(Branching): the box selection and digit order, see branching.py. None for the
+            box with the fewest candidates and the lowest digit first.
+        open_boxes(list): the boxes that were open in the parent node, None for every box
+    Returns:
+        The solved masks list, or False if there is no solution.
+    """
+    popcount = popcount_table(topology.n)
+    if branching is None:
+        branching = branching_policies.DEFAULT
+    if propagation == 'worklist':
+        if changed is None:
+            changed = range(len(masks))
+        if stats is None:
+            masks = propagate(masks, topology, changed, subsets=subsets)
+        else:
+            masks = stats.run('propagate', _counter(masks, popcount), propagate, masks, topology, changed, None,
+                              subsets)
+    else:
+        masks = reduce_puzzle(masks, topology, subsets, stats)
+    if masks is False:
+        return False
+    open_boxes = [box for box in (range(len(masks)) if open_boxes is None else open_boxes) if popcount[masks[box]] > 1]
+    if not open_boxes:
+        return masks
+    if stats is not None:
+        stats.branch(depth)
+    box = branching.select(masks, open_boxes, popcount, topology)
+    for bit in branching.order(masks, box, popcount, topology):
+        new_masks = list(masks)
+        new_masks[box] = bit
+        attempt = search(new_masks, topology, propagation, (box,), subsets, stats, depth + 1, branching, open_boxes)
+        if attempt:
+            return attempt
+        if stats is not None:
+            stats.backtracks += 1
+    return False
+
+
+class Trail(list):
+    """
+    Undo log of (box, previous mask) pairs for backtracking on one shared masks list.
+    The undone attribute counts how many changes have been rolled back so far.
+    """
+
+    def __init__(self):
+        super().__init__()
+        self.undone = 0
+
+    def mark(self):
+        """Return a position that undo() can later roll the masks back to."""
+        return len(self)
+
+    def undo(self, masks, mark):
+        """Restore every change recorded after mark, newest first."""
+        while len(self) > mark:
+            box, mask = self.pop()
+            masks[box] = mask
+            self.undone += 1
+
+
+def search_trail(masks, topology, trail, changed=None, subsets=None, stats=None, depth=0, branching=None,
+                 open_boxes=None):
+    """
+    Same search as search() with worklist propagation, but all branches share one masks
+    list. Every change is recorded on the trail and rolled back when a branch fails, so no
+    copy of the board is made per branch.
+    Args:
+        masks(list): the candidate masks, changed in place
+        topology(Topology): the board topology
+        trail(Trail): the undo log shared by the whole search
+        changed(iterable): the boxes that changed since the last propagation. None means every box.
+        subsets(int): largest naked and hidden subsets to propagate, None for naked twins only
+        stats(SolverStats): if given, strategy and branching statistics are added to it
+        depth(int): the number of guesses made above this call
+        branching(Branching): the box selection and digit order, see search()
+        open_boxes(list): the boxes that were open in the parent node, None for every box
+    Returns:
+        The solved masks list, or False if there is no solution.
+    """
+    popcount = popcount_table(topology.n)
+    if branching is None:
+        branching = branching_policies.DEFAULT
+    if changed is None:
+        changed = range(len(masks))
+    if stats is None:
+        found = propagate(masks, topology, changed, trail, subsets)
+    else:
+        found = stats.run('propagate', _counter(masks, popcount), propagate, masks, topology, changed, trail, subsets)
+    if found is False:
+        return False
+    open_boxes = [box for box in (range(len(masks)) if open_boxes is None else open_boxes) if popcount[masks[box]] > 1]
+    if not open_boxes:
+        return masks
+    if stats is not None:
+        stats.branch(depth)
+    box = branching.select(masks, open_boxes, popcount, topology)
+    for bit in branching.order(masks, box, popcount, topology):
+        mark = trail.mark()
+        trail.append((box, masks[box]))
+        masks[box] = bit
+        if search_trail(masks, topology, trail, (box,), subsets, stats, depth + 1, branching, open_boxes):
+            return masks
+        trail.undo(masks, mark)
+        if stats is not None:
+            stats.backtracks += 1
+    return False
+
+
+def solve(grid, diagonal=True, propagation='sweep', backtracking='copy', trail=None, subsets=None, size=3,
+          stats=False, select='mrv', order='index'):
+    """
+    Find the solution to a Sudoku grid using the bitmask engine.
+    Args:
+        grid(string): a string representing a sudoku grid.
+        diagonal(bool): whether the two main diagonals must hold every digit too
+        propagation(string): 'sweep' or 'worklist', see search()
+        backtracking(string): 'copy' to copy the masks for every branch, 'trail' to undo the
+            changes of a failed branch in place, see search_trail(). 'trail' needs 'worklist' propagation.
+        trail(Trail): the undo log to use with 'trail' backtracking, pass one in to read its
+            undone count afterwards
+        subsets(int): also propagate the naked and hidden subsets of sizes 2 to subsets (at most 4)
+        size(int): the side of a square, 3 for 9x9 boards, 4 for 16x16 and 5 for 25x25
+        stats(bool): True to collect a SolverStats and return it along with the solution
+        select(string): how to pick the box to branch on, 'mrv' or 'degree', see branching.py
+        order(string): the order to try its digits in, 'index', 'lcv' or 'frequency'
+    Returns:
+        The dictionary representation of the final sudoku grid. False if no solution exists.
+        A (values, SolverStats) tuple if stats is True.
+    """
+    if propagation not in ('sweep', 'worklist'):
+        raise ValueError("Unknown propagation mode: {}".format(propagation))
+    policy = branching_policies.get_branching(select, order)
+    topology = get_topology(diagonal, size)
+    solver_stats = SolverStats() if stats else None
+    start = perf_counter()
+    if backtracking == 'trail':
+        if propagation != 'worklist':
+            raise ValueError("Trail backtracking needs 'worklist' propagation")
+        if trail is None:
+            trail = Trail()
+        undone = trail.undone
+        masks = search_trail(grid_masks(grid, topology), topology, trail, subsets=subsets, stats=solver_stats,
+                             branching=policy)
+        if stats:
+            solver_stats.undone += trail.undone - undone
+    elif backtracking == 'copy':
+        masks = search(grid_masks(grid, topology), topology, propagation, subsets=subsets, stats=solver_stats,
+                       branching=policy)
+    else:
+        raise ValueError("Unknown backtracking mode: {}".format(backtracking))
+    values = False if masks is False else masks_values(masks, topology)
+    if stats:
+        solver_stats.seconds += perf_counter() - start
+        return values, solver_stats
+    return values
+
+
+def count_trail(masks, topology, trail, limit=None, changed=None, subsets=None):
+    """
+    Count the solutions below a board with the propagation and trail of search_trail().
+    Args:
+        masks(list): the candidate masks, changed in place. Changes made below a branch are
+            rolled back, those of the propagation of this board are left on the trail.
+        topology(Topology): the board topology
+        trail(Trail): the undo log shared by the whole search
+        limit(int): stop as soon as this many solutions are found, None to count them all
+        changed(iterable): the boxes that changed since the last propagation. None means every box.
+        subsets(int): largest naked and hidden subsets to propagate, None for naked twins only
+    Returns:
+        The number of solutions found, at most limit.
+    """
+    if changed is None:
+        changed = range(len(masks))
+    if propagate(masks, topology, changed, trail, subsets) is False:
+        return 0
+    popcount = popcount_table(topology.n)
+    unsolved = [(popcount[mask], box) for box, mask in enumerate(masks) if popcount[mask] > 1]
+    if not unsolved:
+        return 1
+    n, box = min(unsolved)
+    total = 0
+    candidates = masks[box]
+    while candidates and (limit is None or total < limit):
+        bit = candidates & -candidates
+        candidates ^= bit
+        mark = trail.mark()
+        trail.append((box, masks[box]))
+        masks[box] = bit
+        total += count_trail(masks, topology, trail, None if limit is None else limit - total, (box,), subsets)
+        trail.undo(masks, mark)
+    return total
+
+
+def _count_branch(task):
+    """Count the solutions of one top level branch, a (masks, diagonal, size, limit, subsets) task."""
+    masks, diagonal, size, limit, subsets = task
+    return count_trail(masks, get_topology(diagonal, size), Trail(), limit, subsets=subsets)
+
+
+def count_solutions(grid, limit=2, diagonal=True, size=3, subsets=None, workers=1):
+    """
+    Count the solutions of a Sudoku grid, stopping as soon as limit of them have been found.
+    Args:
+        grid(string): a string representing a sudoku grid, '.' for empty boxes.
+        limit(int): the largest count of interest, None to count every solution
+        diagonal(bool): whether the two main diagonals must hold every digit too
+        size(int): the side of a square, 3 for 9x9 boards, 4 for 16x16 and 5 for 25x25
+        subsets(int): largest naked and hidden subsets to propagate, None for naked twins only
+        workers(int): processes counting the branches of the first guess in parallel. 1 counts
+            in this process, None uses one process per CPU.
+    Returns:
+        The number of solutions found, at most limit.
+    """
+    topology = get_topology(diagonal, size)
+    masks = grid_masks(grid, topology)
+    if workers == 1:
+        return count_trail(masks, topology, Trail(), limit, subsets=subsets)
+    if propagate(masks, topology, range(len(masks)), subsets=subsets) is False:
+        return 0
+    popcount = popcount_table(topology.n)
+    unsolved = [(popcount[mask], box) for box, mask in enumerate(masks) if popcount[mask] > 1]
+    if not unsolved:
+        return 1
+    n, box = min(unsolved)
+    tasks = []
+    candidates = masks[box]
+    while candidates:
+        bit = candidates & -candidates
+        candidates ^= bit
+        branch = list(masks)
+        branch[box] = bit
+        tasks.append((branch, diagonal, size, limit, subsets))
+    total = 0
+    # Leaving the with block terminates the branches still running once the limit is reached
+    with Pool(min(workers or os.cpu_count() or 1, len(tasks))) as pool:
+        for found in pool.imap_unordered(_count_branch, tasks):
+            total += found
+            if limit is not None and total >= limit:
+                return limit
+    return total
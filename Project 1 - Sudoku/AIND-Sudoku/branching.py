@@ -0,0 +1,91 @@
+"""
+Branching policies for the bitmask search: which box to guess next and in what order to try
+its digits.
+
+A policy is a Branching pair of functions:
+    select(masks, open_boxes, popcount, topology) -> the box to branch on
+    order(masks, box, popcount, topology) -> the candidate bits of box in the order to try them
+open_boxes lists the boxes with more than one candidate. The search hands every child the open
+boxes of its parent to filter, so selection only revisits boxes that were still open.
+
+Box selection:
+    'mrv': fewest candidates, the lowest box index on ties. Stops early at two candidates.
+    'degree': fewest candidates, ties broken by the most open peers
+Digit order:
+    'index': lowest digit first
+    'lcv': least constraining value first, the digit found in the fewest peers
+    'frequency': the digit already placed most often on the whole board first
+"""
+
+from collections import namedtuple
+
+Branching = namedtuple('Branching', ['select', 'order'])
+
+
+def _bits(mask):
+    bits = []
+    while mask:
+        bit = mask & -mask
+        bits.append(bit)
+        mask ^= bit
+    return bits
+
+
+def mrv(masks, open_boxes, popcount, topology):
+    """Return the open box with the fewest candidates."""
+    best = best_count = None
+    for box in open_boxes:
+        count = popcount[masks[box]]
+        if best_count is None or count < best_count:
+            best, best_count = box, count
+            if count == 2:
+                break
+    return best
+
+
+def mrv_degree(masks, open_boxes, popcount, topology):
+    """Return the open box with the fewest candidates and, among those, the most open peers."""
+    fewest = min(popcount[masks[box]] for box in open_boxes)
+    tied = [box for box in open_boxes if popcount[masks[box]] == fewest]
+    if len(tied) == 1:
+        return tied[0]
+    return max(tied, key=lambda box: sum(1 for peer in topology.index_peers[box] if popcount[masks[peer]] > 1))
+
+
+def index_order(masks, box, popcount, topology):
+    """Return the candidate bits of box, lowest digit first."""
+    return _bits(masks[box])
+
+
+def lcv_order(masks, box, popcount, topology):
+    """Return the candidate bits of box, the one removing the fewest peer candidates first."""
+    peers = topology.index_peers[box]
+    return sorted(_bits(masks[box]), key=lambda bit: sum(1 for peer in peers if masks[peer] & bit))
+
+
+def frequency_order(masks, box, popcount, topology):
+    """
+    Return the candidate bits of box, the digit solved in the most boxes of the board first.
+    Placements are counted over the whole board rather than the units of box: once propagated,
+    no candidate of box is solved anywhere in its units, so the counts there would all be zero.
+    """
+    placed = {}
+    for mask in masks:
+        if popcount[mask] == 1:
+            placed[mask] = placed.get(mask, 0) + 1
+    return sorted(_bits(masks[box]), key=lambda bit: -placed.get(bit, 0))
+
+
+SELECTORS = {'mrv': mrv, 'degree': mrv_degree}
+ORDERINGS = {'index': index_order, 'lcv': lcv_order, 'frequency': frequency_order}
+
+DEFAULT = Branching(mrv, index_order)
+
+
+def get_branching(select='mrv', order='index'):
+    """Return the Branching policy of a selection and an ordering name."""
+    if select not in SELECTORS:
+        raise ValueError("Unknown box selection: {}".format(select))
+    if order not in ORDERINGS:
+        raise ValueError("Unknown digit order: {}".format(order))
+    return Branching(SELECTORS[select], ORDERINGS[order])
@@ -0,0 +1,265 @@
+"""
+Canonical forms of Sudoku grids and a solution cache keyed by them.
+
+Two puzzles are isomorphic when one turns into the other by relabelling the digits and
+permuting the board without breaking any unit: transposing it, swapping bands or stacks, and
+swapping rows within a band or columns within a stack. Isomorphic puzzles share one canonical
+form, the smallest relabelled grid string over the transformations considered, so a solution
+cached for one of them answers all of them once transformed back.
+
+    cache = SolutionCache(maxsize=4096, path='solutions.db')
+    values = solution.solve(grid, backend='bitmask', cache=cache)
+
+Standard boards: only the orderings that sort bands, rows, stacks and columns by clue counts are
+tried, which is enough because those counts move along with the lines. Diagonal boards allow only
+the transformations that map the two diagonals onto themselves: one band-respecting permutation
+p that commutes with reversal is applied to the rows and, reversed or not, to the columns.
+
+Puzzles with more candidate transformations than the budget, e.g. nearly empty grids, are not
+canonicalized and simply bypass the cache.
+"""
+
+import shelve
+from collections import OrderedDict
+from functools import lru_cache
+from itertools import permutations, product
+from math import factorial
+
+from topology import get_topology
+
+MAX_TRANSFORMS = 4096
+
+
+def _tied_orders(items, key):
+    """Return every ordering of items sorted by key, in which only items with equal keys swap places."""
+    items = sorted(items, key=key)
+    groups = []
+    for item in items:
+        if groups and key(groups[-1][0]) == key(item):
+            groups[-1].append(item)
+        else:
+            groups.append([item])
+    return [sum(parts, ()) for parts in product(*(list(permutations(group)) for group in groups))]
+
+
+def _line_orders(cells, n, size, budget):
+    """
+    Return the orderings of the rows of cells that sort bands, then rows within each band, by their
+    clue counts per stack, or None if there are more than budget of them.
+    """
+    # counts[r][k]: clues of row r in stack k
+    counts = [[sum(1 for c in range(k * size, (k + 1) * size) if cells[r * n + c] != '.') for k in range(size)]
+              for r in range(n)]
+
+    def row_key(r):
+        return sum(counts[r]), sorted(counts[r])
+
+    def band_key(b):
+        stacks = [sum(counts[r][k] for r in range(b * size, (b + 1) * size)) for k in range(size)]
+        return sum(stacks), sorted(stacks)
+
+    band_orders = _tied_orders(range(size), band_key)
+    inner = [_tied_orders(range(b * size, (b + 1) * size), row_key) for b in range(size)]
+    total = len(band_orders)
+    for orders in inner:
+        total *= len(orders)
+    if total > budget:
+        return None
+    return [sum(parts, ()) for bands in band_orders for parts in product(*(inner[b] for b in bands))]
+
+
+@lru_cache(maxsize=None)
+def _diagonal_orders(size):
+    """
+    Return the band-respecting permutations of range(n) that commute with reversal,
+    p[n - 1 - i] == n - 1 - p[i], so that the diagonals of the board are kept.
+    """
+    n = size * size
+    result = []
+    for bands in permutations(range(size)):
+        if any(bands[size - 1 - b] != size - 1 - bands[b] for b in range(size)):
+            continue
+        # The rows of the first half of the bands are free, the mirrored half follows them
+        choices = []
+        for b in range((size + 1) // 2):
+            inner = list(permutations(range(size)))
+            if b == size - 1 - b:
+                inner = [q for q in inner if all(q[size - 1 - i] == size - 1 - q[i] for i in range(size))]
+            choices.append(inner)
+        for inner in product(*choices):
+            p = [0] * n
+            for b, q in enumerate(inner):
+                for i in range(size):
+                    p[b * size + i] = bands[b] * size + q[i]
+                    p[n - 1 - (b * size + i)] = n - 1 - (bands[b] * size + q[i])
+            result.append(tuple(p))
+    return tuple(result)
+
+
+def _diagonal_count(size):
+    """Number of permutations _diagonal_orders() would build, without building them."""
+    bands = sum(1 for perm in permutations(range(size))
+                if all(perm[size - 1 - b] == size - 1 - perm[b] for b in range(size)))
+    count = bands * factorial(size) ** (size // 2)
+    if size % 2:
+        count *= bands
+    return count
+
+
+def _relabel(cells, digits):
+    """Relabel the digits of cells in order of first appearance. Returns (string, mapping)."""
+    mapping = {}
+    out = []
+    for value in cells:
+        if value == '.':
+            out.append(value)
+        else:
+            label = mapping.get(value)
+            if label is None:
+                label = mapping[value] = digits[len(mapping)]
+            out.append(label)
+    return ''.join(out), mapping
+
+
+def canonical_form(grid, diagonal=True, size=3, budget=MAX_TRANSFORMS):
+    """
+    Find the canonical form of a grid.
+    Args:
+        grid(string): a string representing a sudoku grid, '.' for empty boxes.
+        diagonal(bool): whether the two main diagonals are units, which restricts the transformations
+        size(int): the side of a square, 3 for 9x9 boards
+        budget(int): the largest number of transformations to try
+    Returns:
+        A tuple (key, source, mapping): the canonical grid string, the box of grid that each box
+        of the canonical grid comes from, and the relabelling of the digits of grid. None if the
+        grid needs more than budget transformations.
+    """
+    topology = get_topology(diagonal, size)
+    n = topology.n
+    if len(grid) != n * n:
+        raise ValueError("Expected a grid of {} boxes, got {}".format(n * n, len(grid)))
+    transposed = ''.join(grid[c * n + r] for r in range(n) for c in range(n))
+    if diagonal:
+        if 4 * _diagonal_count(size) > budget:
+            return None
+        orders = _diagonal_orders(size)
+        pairs = [(p, q) for p in orders for q in (p, tuple(n - 1 - i for i in p))]
+        candidates = [(False, pairs), (True, pairs)]
+    else:
+        candidates = []
+        for flipped, cells in ((False, grid), (True, transposed)):
+            rows = _line_orders(cells, n, size, budget)
+            cols = rows and _line_orders(''.join(cells[c * n + r] for r in range(n) for c in range(n)), n, size,
+                                         budget)
+            if not cols or 2 * len(rows) * len(cols) > budget:
+                return None
+            candidates.append((flipped, list(product(rows, cols))))
+    best = None
+    for flipped, pairs in candidates:
+        for rows, cols in pairs:
+            if flipped:
+                source = [c * n + r for r in rows for c in cols]
+            else:
+                source = [r * n + c for r in rows for c in cols]
+            key, mapping = _relabel([grid[i] for i in source], topology.digits)
+            if best is None or key < best[0]:
+                best = (key, source, mapping)
+    return best
+
+
+def _full_mapping(mapping, digits):
+    """Extend a relabelling to the digits absent from the grid, which are interchangeable."""
+    mapping = dict(mapping)
+    free = [d for d in digits if d not in mapping.values()]
+    for digit in digits:
+        if digit not in mapping:
+            mapping[digit] = free.pop(0)
+    return mapping
+
+
+class SolutionCache(object):
+    """
+    Bounded LRU cache of solutions keyed by canonical form, optionally backed by a shelve file.
+    Args:
+        maxsize(int): solutions kept in memory, the least recently used ones are dropped first
+        path(string): if given, solutions are also stored in this shelve file and survive restarts
+        budget(int): the largest number of transformations canonical_form() may try
+    The hits, misses and bypassed attributes count the lookups answered from the cache, the ones
+    that had to be solved, and the grids that could not be canonicalized.
+    """
+
+    def __init__(self, maxsize=1024, path=None, budget=MAX_TRANSFORMS):
+        self.maxsize = maxsize
+        self.budget = budget
+        self._memory = OrderedDict()
+        self._disk = shelve.open(path) if path is not None else None
+        self.hits = 0
+        self.misses = 0
+        self.bypassed = 0
+
+    def _get(self, key):
+        solution = self._memory.get(key)
+        if solution is not None:
+            self._memory.move_to_end(key)
+            return solution
+        if self._disk is not None and key in self._disk:
+            solution = self._disk[key]
+            self._put(key, solution, disk=False)
+            return solution
+        return None
+
+    def _put(self, key, solution, disk=True):
+        self._memory[key] = solution
+        self._memory.move_to_end(key)
+        if len(self._memory) > self.maxsize:
+            self._memory.popitem(last=False)
+        if disk and self._disk is not None:
+            self._disk[key] = solution
+
+    def solve(self, grid, solver, diagonal=True, size=3):
+        """
+        Solve a grid through the cache.
+        Args:
+            grid(string): a string representing a sudoku grid.
+            solver(callable): called with grid on a miss, returns the solution in dictionary form
+                or False
+            diagonal(bool): whether the two main diagonals must hold every digit too
+            size(int): the side of a square, 3 for 9x9 boards
+        Returns:
+            The dictionary representation of the solved grid. False if no solution exists.
+        """
+        form = canonical_form(grid, diagonal, size, self.budget)
+        if form is None:
+            self.bypassed += 1
+            return solver(grid)
+        key, source, mapping = form
+        topology = get_topology(diagonal, size)
+        # Puzzles of different variants never share an entry
+        key = '{}{}:{}'.format(size, 'd' if diagonal else 's', key)
+        mapping = _full_mapping(mapping, topology.digits)
+        solution = self._get(key)
+        if solution is not None:
+            self.hits += 1
+            if not solution:
+                return False
+            inverse = dict((label, digit) for digit, label in mapping.items())
+            cells = [None] * len(source)
+            for i, box in enumerate(source):
+                cells[box] = inverse[solution[i]]
+            return dict(zip(topology.boxes, cells))
+        self.misses += 1
+        values = solver(grid)
+        if values:
+            self._put(key, ''.join(mapping[values[topology.boxes[box]]] for box in source))
+        else:
+            self._put(key, '')
+        return values
+
+    def __len__(self):
+        return len(self._memory)
+
+    def close(self):
+        """Close the disk store, if any."""
+        if self._disk is not None:
+            self._disk.close()
+            self._disk = None
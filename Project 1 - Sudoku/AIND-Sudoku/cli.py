@@ -0,0 +1,114 @@
+"""
+Command line solver for files of puzzles, one grid per line.
+
+    python cli.py puzzles.txt -o solutions.txt --workers 4 --standard
+    cat puzzles.txt | python cli.py --backend dlx > solutions.txt
+
+Grids are read lazily and every solution is written as soon as it is ready, in input order: the
+solved grid string, 'unsolvable', or 'error: ...' if the grid could not be read. Blank lines are
+skipped. A summary with puzzles per second and solve latency percentiles goes to stderr.
+"""
+
+import argparse
+import sys
+import time
+
+from batch import solve_stream
+from topology import get_topology
+
+
+def percentile(ordered, fraction):
+    """Return the nearest-rank percentile of a sorted, non-empty list."""
+    return ordered[min(len(ordered) - 1, max(0, int(round(fraction * len(ordered))) - 1))]
+
+
+def read_grids(lines):
+    """Yield the stripped non-blank lines of an iterable of lines."""
+    for line in lines:
+        line = line.strip()
+        if line:
+            yield line
+
+
+def format_result(result, topology):
+    """Return the output line of a SolveResult."""
+    if result.error is not None:
+        return 'error: ' + result.error
+    if not result.values:
+        return 'unsolvable'
+    return ''.join(result.values[box] for box in topology.boxes)
+
+
+def summary(latencies, seconds, unsolvable, errors):
+    """Return the end of run report: counts, throughput and latency percentiles in milliseconds."""
+    count = len(latencies)
+    lines = ['{} puzzles, {} unsolvable, {} errors in {:.3f} s, {:.1f} puzzles/s'.format(
+        count, unsolvable, errors, seconds, count / seconds if seconds else 0.0)]
+    if latencies:
+        ordered = sorted(latencies)
+        lines.append('latency ms: p50 {:.3f}, p90 {:.3f}, p99 {:.3f}, max {:.3f}'.format(
+            *(percentile(ordered, fraction) * 1000 for fraction in (0.5, 0.9, 0.99, 1.0))))
+    return '\n'.join(lines)
+
+
+def run(lines, output, workers=1, chunksize=16, diagonal=True, size=3, **options):
+    """
+    Solve every grid of lines and write one result line per grid to output.
+    Args:
+        lines(iterable): lines of text, one grid per line
+        output(file): where the result lines are written
+        workers(int): number of worker processes, None for one per CPU
+        chunksize(int): number of grids sent to a worker at a time
+        diagonal(bool): whether the two main diagonals must hold every digit too
+        size(int): the side of a square, 3 for 9x9 boards
+        **options: keyword arguments passed on to solution.solve(), e.g. backend='dlx'
+    Returns:
+        The summary() report of the run.
+    """
+    topology = get_topology(diagonal, size)
+    latencies = []
+    unsolvable = errors = 0
+    start = time.perf_counter()
+    for result in solve_stream(read_grids(lines), workers, chunksize, diagonal=diagonal, size=size, **options):
+        output.write(format_result(result, topology) + '\n')
+        latencies.append(result.seconds)
+        if result.error is not None:
+            errors += 1
+        elif not result.values:
+            unsolvable += 1
+    output.flush()
+    return summary(latencies, time.perf_counter() - start, unsolvable, errors)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Solve Sudoku puzzles, one grid per line.')
+    parser.add_argument('input', nargs='?', default='-', help="file of grids, '-' for stdin (default)")
+    parser.add_argument('-o', '--output', default='-', help="file for the solutions, '-' for stdout (default)")
+    parser.add_argument('--workers', type=int, default=1, help='worker processes, 0 for one per CPU (default 1)')
+    parser.add_argument('--chunksize', type=int, default=16, help='grids sent to a worker at a time')
+    parser.add_argument('--backend', choices=('bitmask', 'dlx', 'string'), default='bitmask')
+    parser.add_argument('--propagation', choices=('sweep', 'worklist'), default='worklist',
+                        help='bitmask backend only')
+    parser.add_argument('--backtracking', choices=('copy', 'trail'), default='trail', help='bitmask backend only')
+    parser.add_argument('--subsets', type=int, help='largest naked and hidden subsets to propagate (bitmask)')
+    parser.add_argument('--standard', action='store_true', help='standard rules, without the diagonal units')
+    parser.add_argument('--size', type=int, default=3, help='box size: 3 for 9x9, 4 for 16x16, 5 for 25x25')
+    args = parser.parse_args(argv)
+
+    options = {'backend': args.backend, 'subsets': args.subsets}
+    if args.backend == 'bitmask':
+        options.update(propagation=args.propagation, backtracking=args.backtracking)
+    source = sys.stdin if args.input == '-' else open(args.input)
+    output = sys.stdout if args.output == '-' else open(args.output, 'w')
+    try:
+        report = run(source, output, args.workers or None, args.chunksize, not args.standard, args.size, **options)
+    finally:
+        if source is not sys.stdin:
+            source.close()
+        if output is not sys.stdout:
+            output.close()
+    print(report, file=sys.stderr)
+
+
+if __name__ == '__main__':
+    main()
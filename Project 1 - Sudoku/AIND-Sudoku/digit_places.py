@@ -0,0 +1,78 @@
+"""
+Values dictionary that keeps, for every unit and digit, the number of boxes of the unit where
+the digit still fits.
+
+The counts are updated by __setitem__ whenever a box loses candidates, so assign_value() keeps
+them current without any change to the strategies. A (unit, digit) pair whose count drops to 1 is
+queued right away, and only_choice() handles the queue instead of rescanning every unit and digit.
+
+    values = DigitPlaces(grid_values(grid), topology)
+"""
+
+# (diagonal, size) -> {box name: positions in unit_list of the units containing the box}
+_box_units = {}
+
+
+class DigitPlaces(dict):
+    """
+    A values dictionary {'A1': '123', ...} with per unit digit counts.
+        topology: the board topology
+        box_units: box name -> positions in topology.unit_list of the units of the box
+        counts: counts[u][digit] is the number of boxes of topology.unit_list[u] where digit fits
+        singles: the (u, digit) pairs whose count dropped to 1 and were not handled yet
+    copy() copies the counts too, so every branch of search() keeps its own.
+    """
+
+    def __init__(self, values, topology):
+        super().__init__(values)
+        self.topology = topology
+        key = (topology.diagonal, topology.size)
+        if key not in _box_units:
+            _box_units[key] = dict(zip(topology.boxes, topology.box_units))
+        self.box_units = _box_units[key]
+        self.counts = []
+        self.singles = []
+        for u, unit in enumerate(topology.unit_list):
+            counts = dict.fromkeys(topology.digits, 0)
+            for box in unit:
+                for digit in values[box]:
+                    counts[digit] += 1
+            self.counts.append(counts)
+            self.singles.extend((u, digit) for digit, count in counts.items() if count == 1)
+
+    def __setitem__(self, box, value):
+        old = self[box]
+        dict.__setitem__(self, box, value)
+        for digit in old:
+            if digit not in value:
+                for u in self.box_units[box]:
+                    counts = self.counts[u]
+                    counts[digit] -= 1
+                    if counts[digit] == 1:
+                        self.singles.append((u, digit))
+
+    def copy(self):
+        other = dict.__new__(DigitPlaces)
+        dict.update(other, self)
+        other.topology = self.topology
+        other.box_units = self.box_units
+        other.counts = [dict(counts) for counts in self.counts]
+        other.singles = list(self.singles)
+        return other
+
+    def pop_single(self):
+        """
+        Return the next (box, digit) hidden single, the only box of a unit left for a digit, or
+        None when there is none. Pairs whose box is already solved are skipped.
+        """
+        while self.singles:
+            u, digit = self.singles.pop()
+            if self.counts[u][digit] != 1:
+                continue
+            for box in self.topology.unit_list[u]:
+                value = dict.__getitem__(self, box)
+                if digit in value:
+                    if len(value) > 1:
+                        return box, digit
+                    break
+        return None
@@ -0,0 +1,243 @@
+"""
+Dancing Links (Algorithm X) exact cover backend for the Sudoku solver.
+
+Each candidate placement (box, digit) is a row of the exact cover matrix. The columns are
+the constraints every solution covers exactly once: each box holds one digit, and each row,
+column and square holds every digit once. The diagonal variant adds one column per
+(diagonal, digit) pair. The matrix for each variant is linked once and then copied for
+every puzzle, so a solve only pays for covering the clues and the search itself.
+"""
+
+from itertools import islice
+
+from topology import get_topology
+
+
+class DancingLinks(object):
+    """
+    Sparse 0/1 matrix as circular doubly linked lists stored in flat integer lists.
+    Node 0 is the root, nodes 1..n_columns are the column headers and every other node
+    is a 1 of the matrix, tagged with the id of the row it belongs to.
+    """
+
+    def __init__(self, n_columns):
+        n = n_columns + 1
+        self.L = [i - 1 for i in range(n)]
+        self.L[0] = n_columns
+        self.R = [i + 1 for i in range(n)]
+        self.R[n_columns] = 0
+        self.U = list(range(n))
+        self.D = list(range(n))
+        self.C = list(range(n))
+        self.S = [0] * n
+        self.row_id = [-1] * n
+        self.row_node = {}
+
+    def add_row(self, row_id, columns):
+        """Append a row with a 1 in each of the given columns (1-based)."""
+        L, R, U, D = self.L, self.R, self.U, self.D
+        first = None
+        for c in columns:
+            node = len(self.C)
+            self.C.append(c)
+            self.row_id.append(row_id)
+            U.append(U[c])
+            D.append(c)
+            D[U[c]] = node
+            U[c] = node
+            self.S[c] += 1
+            if first is None:
+                first = node
+                L.append(node)
+                R.append(node)
+            else:
+                L.append(L[first])
+                R.append(first)
+                R[L[first]] = node
+                L[first] = node
+        self.row_node[row_id] = first
+
+    def copy(self):
+        """Return an independent copy of the matrix, ready to be searched."""
+        other = DancingLinks.__new__(DancingLinks)
+        other.L, other.R, other.U, other.D = list(self.L), list(self.R), list(self.U), list(self.D)
+        other.C, other.S = self.C, list(self.S)
+        other.row_id, other.row_node = self.row_id, self.row_node
+        return other
+
+    def cover(self, c):
+        """Remove column c and every row that has a 1 in it."""
+        L, R, U, D, C, S = self.L, self.R, self.U, self.D, self.C, self.S
+        R[L[c]] = R[c]
+        L[R[c]] = L[c]
+        i = D[c]
+        while i != c:
+            j = R[i]
+            while j != i:
+                D[U[j]] = D[j]
+                U[D[j]] = U[j]
+                S[C[j]] -= 1
+                j = R[j]
+            i = D[i]
+
+    def uncover(self, c):
+        """Undo cover(c)."""
+        L, R, U, D, C, S = self.L, self.R, self.U, self.D, self.C, self.S
+        i = U[c]
+        while i != c:
+            j = L[i]
+            while j != i:
+                S[C[j]] += 1
+                D[U[j]] = j
+                U[D[j]] = j
+                j = L[j]
+            i = U[i]
+        R[L[c]] = c
+        L[R[c]] = c
+
+    def select(self, row_id):
+        """
+        Put a row in the solution before searching, covering all of its columns.
+        Returns False if one of them was already covered by an earlier selection.
+        """
+        L, R = self.L, self.R
+        node = self.row_node[row_id]
+        j = node
+        while True:
+            c = self.C[j]
+            if R[L[c]] != c:
+                return False
+            self.cover(c)
+            j = R[j]
+            if j == node:
+                return True
+
+    def search(self, partial=None):
+        """
+        Generate every exact cover of the remaining columns as a list of row ids.
+        The matrix is restored after each yielded solution, but not if the generator is
+        abandoned halfway, so search a fresh copy() each time.
+        """
+        if partial is None:
+            partial = []
+        L, R, D, C, S = self.L, self.R, self.D, self.C, self.S
+        if R[0] == 0:
+            yield list(partial)
+            return
+
+        # Branch on the column with the fewest remaining rows
+        c = R[0]
+        best = c
+        size = S[c]
+        while c != 0 and size > 1:
+            if S[c] < size:
+                best, size = c, S[c]
+            c = R[c]
+        if size == 0:
+            return
+        c = best
+
+        self.cover(c)
+        r = D[c]
+        while r != c:
+            partial.append(self.row_id[r])
+            j = R[r]
+            while j != r:
+                self.cover(C[j])
+                j = R[j]
+            yield from self.search(partial)
+            j = L[r]
+            while j != r:
+                self.uncover(C[j])
+                j = L[j]
+            partial.pop()
+            r = D[r]
+        self.uncover(c)
+
+
+def _build_matrix(diagonal, size):
+    """
+    Link the exact cover matrix of one Sudoku variant.
+    Row id n * box + d stands for digit d + 1 in box (boxes numbered from 0 in reading order).
+    """
+    n = size * size
+    cells = n * n
+    n_columns = 4 * cells + (2 * n if diagonal else 0)
+    matrix = DancingLinks(n_columns)
+    for box in range(cells):
+        r, c = divmod(box, n)
+        square = size * (r // size) + c // size
+        for d in range(n):
+            columns = [1 + box, 1 + cells + n * r + d, 1 + 2 * cells + n * c + d, 1 + 3 * cells + n * square + d]
+            if diagonal and r == c:
+                columns.append(1 + 4 * cells + d)
+            if diagonal and r + c == n - 1:
+                columns.append(1 + 4 * cells + n + d)
+            matrix.add_row(n * box + d, columns)
+    return matrix
+
+
+_matrices = {}
+
+
+def _matrix(diagonal, size):
+    """Return the linked matrix of a variant, building it on first use."""
+    matrix = _matrices.get((diagonal, size))
+    if matrix is None:
+        matrix = _matrices[(diagonal, size)] = _build_matrix(diagonal, size)
+    return matrix
+
+
+def solutions(grid, diagonal=True, size=3):
+    """
+    Generate every solution of a Sudoku grid.
+    Args:
+        grid(string): a string representing a sudoku grid, '.' for empty boxes.
+        diagonal(bool): whether the two main diagonals must hold every digit too
+        size(int): the side of a square, 3 for 9x9 boards, 4 for 16x16 and 5 for 25x25
+    Returns:
+        A generator of solved grids in dictionary form.
+    """
+    topology = get_topology(diagonal, size)
+    n, digits = topology.n, topology.digits
+    assert len(grid) == n * n
+    matrix = _matrix(diagonal, size).copy()
+    for box, value in enumerate(grid):
+        if value != '.' and not matrix.select(n * box + digits.index(value)):
+            return
+    for row_ids in matrix.search():
+        values = list(grid)
+        for row_id in row_ids:
+            box, d = divmod(row_id, n)
+            values[box] = digits[d]
+        yield dict(zip(topology.boxes, values))
+
+
+def solve(grid, diagonal=True, size=3):
+    """
+    Find the first solution of a Sudoku grid.
+    Returns:
+        The dictionary representation of the solved grid. False if no solution exists.
+    """
+    for values in solutions(grid, diagonal, size):
+        return values
+    return False
+
+
+def count(grid, limit=None, diagonal=True, size=3):
+    """
+    Count the solutions of a Sudoku grid, stopping once limit of them have been found.
+    Args:
+        grid(string): a string representing a sudoku grid.
+        limit(int): the largest count of interest, None to count every solution
+        diagonal(bool): whether the two main diagonals must hold every digit too
+        size(int): the side of a square, 3 for 9x9 boards
+    Returns:
+        The number of solutions found, at most limit.
+    """
+    return sum(1 for values in islice(solutions(grid, diagonal, size), limit))
+
+
+def solve_all(grid, limit=None, diagonal=True, size=3):
+    """Return a list with every solution of a Sudoku grid, or the first limit of them."""
+    return list(islice(solutions(grid, diagonal, size), limit))
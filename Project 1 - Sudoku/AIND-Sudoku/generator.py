@@ -0,0 +1,188 @@
+"""
+Generator of Sudoku puzzles with a single solution, sorted into difficulty tiers.
+
+    python generator.py --tier hard --count 1000 --workers 4 -o hard.txt
+
+Each puzzle starts from a random full grid. Its clues are blanked in random order, and a blank
+is kept only while count_solutions() still finds a single solution, so every puzzle written is
+unique. Difficulty is the number of branch points the bitmask search needs, with worklist
+propagation and naked twins. The diagonal units constrain the propagation less, so the
+diagonal tiers ask for more branch points than the standard ones:
+    easy: 0 for both, propagation alone solves it
+    medium: 1 to 3 diagonal, 1 standard
+    hard: 4 to 19 diagonal, 2 to 4 standard
+    expert: 20 or more diagonal, 5 or more standard
+Blanks that would push a puzzle above its tier are put back, and a puzzle that ends below its
+tier is dropped for a new full grid.
+
+Puzzles are written one grid per line as soon as they are ready, in the format read by cli.py.
+Puzzle i of a run only depends on the tier, the rules, the seed and i, so a run is reproducible with any number of
+workers. A summary with puzzles per second goes to stderr.
+"""
+
+import argparse
+import os
+import random
+import sys
+import time
+from collections import namedtuple
+from multiprocessing import Pool
+
+import bitmask_solver
+import dlx_solver
+import solution
+from topology import get_topology
+
+TIERS = ('easy', 'medium', 'hard', 'expert')
+
+# diagonal -> tier -> (fewest, most) branch points, None for no upper bound
+BRANCH_POINTS = {
+    True: {'easy': (0, 0), 'medium': (1, 3), 'hard': (4, 19), 'expert': (20, None)},
+    False: {'easy': (0, 0), 'medium': (1, 1), 'hard': (2, 4), 'expert': (5, None)},
+}
+
+Puzzle = namedtuple('Puzzle', ['index', 'grid', 'clues', 'branch_points', 'attempts'])
+Puzzle.__doc__ = """
+One generated puzzle.
+    index: position of the puzzle in the run
+    grid: the puzzle, '.' for the blanks
+    clues: the number of clues left
+    branch_points: branch points of the bitmask search on the puzzle
+    attempts: full grids tried before one ended in the tier
+"""
+
+
+def full_grid(rnd, diagonal):
+    """Return a random solved grid string."""
+    topology = get_topology(diagonal)
+    while True:
+        cells = ['.'] * 81
+        for box in rnd.sample(range(81), 11):
+            cells[box] = rnd.choice(topology.digits)
+        values = dlx_solver.solve(''.join(cells), diagonal)
+        if values:
+            return ''.join(values[box] for box in topology.boxes)
+
+
+def remove_clues(grid, rnd, diagonal, keep=17, accept=None):
+    """
+    Blank the clues of grid in random order while the puzzle keeps a single solution.
+    Stops at keep clues, so keep=17 gives a minimal puzzle.
+    Args:
+        accept(function): if given, a blank is also put back unless accept(puzzle) is True for
+            the puzzle string with the blank
+    """
+    cells = list(grid)
+    order = [box for box in range(81) if cells[box] != '.']
+    rnd.shuffle(order)
+    clues = len(order)
+    for box in order:
+        if clues <= keep:
+            break
+        value, cells[box] = cells[box], '.'
+        puzzle = ''.join(cells)
+        if bitmask_solver.count_solutions(puzzle, 2, diagonal) == 1 and (accept is None or accept(puzzle)):
+            clues -= 1
+        else:
+            cells[box] = value
+    return ''.join(cells)
+
+
+def branch_points(grid, diagonal):
+    """Return the branch points of the worklist bitmask search on grid."""
+    values, stats = solution.solve(grid, backend='bitmask', propagation='worklist', backtracking='trail',
+                                   diagonal=diagonal, stats=True)
+    return stats.branch_points
+
+
+def generate_one(task):
+    """
+    Generate one puzzle of a tier, a (index, tier, seed, diagonal, attempts) task.
+    Returns:
+        A Puzzle, or None if no puzzle ended in the tier within attempts full grids.
+    """
+    index, tier, seed, diagonal, attempts = task
+    fewest, most = BRANCH_POINTS[diagonal][tier]
+    rnd = random.Random('{}-{}-{}-{}'.format(tier, seed, diagonal, index))
+    accept = None if most is None else (lambda puzzle: branch_points(puzzle, diagonal) <= most)
+    for attempt in range(1, attempts + 1):
+        grid = remove_clues(full_grid(rnd, diagonal), rnd, diagonal, accept=accept)
+        branches = branch_points(grid, diagonal)
+        if branches >= fewest:
+            return Puzzle(index, grid, 81 - grid.count('.'), branches, attempt)
+    return None
+
+
+def generate(count, tier='hard', seed=1, diagonal=True, workers=None, attempts=100):
+    """
+    Generate puzzles of a tier over a pool of worker processes.
+    Args:
+        count(int): number of puzzles
+        tier(string): a name from TIERS
+        seed(int): seed of the run
+        diagonal(bool): whether the two main diagonals must hold every digit too
+        workers(int): number of worker processes, None for one per CPU, 1 to generate in this process
+        attempts(int): full grids tried per puzzle before giving up on it
+    Returns:
+        A generator of Puzzle in index order, with None for the puzzles given up on.
+    """
+    if tier not in TIERS:
+        raise ValueError("Unknown tier: {}".format(tier))
+    if workers is None:
+        workers = os.cpu_count() or 1
+    tasks = ((index, tier, seed, diagonal, attempts) for index in range(count))
+    if workers == 1:
+        for task in tasks:
+            yield generate_one(task)
+        return
+    with Pool(workers) as pool:
+        yield from pool.imap(generate_one, tasks)
+
+
+def run(output, count, tier='hard', seed=1, diagonal=True, workers=None, attempts=100):
+    """
+    Generate puzzles and write one grid per line to output as soon as each is ready.
+    Returns:
+        The report of the run: puzzles, failures, clues and branch points, puzzles per second.
+    """
+    start = time.perf_counter()
+    written = failed = clues = branches = 0
+    for puzzle in generate(count, tier, seed, diagonal, workers, attempts):
+        if puzzle is None:
+            failed += 1
+            continue
+        output.write(puzzle.grid + '\n')
+        output.flush()
+        written += 1
+        clues += puzzle.clues
+        branches += puzzle.branch_points
+    seconds = time.perf_counter() - start
+    lines = ['{} {} puzzles, {} given up, in {:.3f} s, {:.2f} puzzles/s'.format(
+        written, tier, failed, seconds, written / seconds if seconds else 0.0)]
+    if written:
+        lines.append('{:.1f} clues, {:.1f} branch points on average'.format(clues / written, branches / written))
+    return '\n'.join(lines)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Generate Sudoku puzzles with a single solution.')
+    parser.add_argument('-o', '--output', default='-', help="file for the puzzles, '-' for stdout (default)")
+    parser.add_argument('--tier', choices=TIERS, default='hard')
+    parser.add_argument('--count', type=int, default=100)
+    parser.add_argument('--seed', type=int, default=1)
+    parser.add_argument('--workers', type=int, default=0, help='worker processes, 0 for one per CPU (default)')
+    parser.add_argument('--attempts', type=int, default=100, help='full grids tried per puzzle before giving up')
+    parser.add_argument('--standard', action='store_true', help='standard rules, without the diagonal units')
+    args = parser.parse_args(argv)
+
+    output = sys.stdout if args.output == '-' else open(args.output, 'w')
+    try:
+        report = run(output, args.count, args.tier, args.seed, not args.standard, args.workers or None, args.attempts)
+    finally:
+        if output is not sys.stdout:
+            output.close()
+    print(report, file=sys.stderr)
+
+
+if __name__ == '__main__':
+    main()
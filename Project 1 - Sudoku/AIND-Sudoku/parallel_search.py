@@ -0,0 +1,141 @@
+"""
+Parallel search of a single hard puzzle over a process pool.
+
+    values = solve_parallel(grid, workers=4)
+
+The search tree is first expanded breadth first to a frontier of subproblems, a few per worker.
+Every worker runs a depth first search of its subproblem with the worklist propagation of
+bitmask_solver, but only for a budget of nodes. A subtree that is not finished within the budget
+comes back as the unexplored nodes of its depth first stack, which are queued again and picked
+up by whichever workers are idle. As soon as one worker finds a solution the pool is terminated,
+cancelling the others.
+
+A subproblem is a (masks, changed) pair: a board that still has to be propagated, changed being
+the boxes assigned since the last propagation, or None for every box.
+"""
+
+import os
+from collections import deque
+from multiprocessing import Pool
+from queue import Queue
+
+import bitmask_solver
+from branching import get_branching
+from topology import get_topology
+
+SOLVED, FAILED, SPLIT = 'solved', 'failed', 'split'
+
+
+def _propagate(masks, topology, changed, subsets):
+    return bitmask_solver.propagate(masks, topology, range(len(masks)) if changed is None else changed,
+                                    subsets=subsets)
+
+
+def _children(masks, topology, policy, popcount):
+    """Return the subproblems of a propagated board in the order to try them, None if it is solved."""
+    open_boxes = [box for box, mask in enumerate(masks) if popcount[mask] > 1]
+    if not open_boxes:
+        return None
+    box = policy.select(masks, open_boxes, popcount, topology)
+    children = []
+    for bit in policy.order(masks, box, popcount, topology):
+        child = list(masks)
+        child[box] = bit
+        children.append((child, (box,)))
+    return children
+
+
+def explore(task):
+    """
+    Search one subproblem for at most budget nodes.
+    Args:
+        task(tuple): (subproblem, diagonal, size, subsets, select, order, budget)
+    Returns:
+        (SOLVED, masks) with the solution, (FAILED, None) if the subtree has no solution, or
+        (SPLIT, subproblems) with the unexplored part of the subtree once the budget is spent.
+    """
+    node, diagonal, size, subsets, select, order, budget = task
+    topology = get_topology(diagonal, size)
+    policy = get_branching(select, order)
+    popcount = bitmask_solver.popcount_table(topology.n)
+    stack = [node]
+    nodes = 0
+    while stack:
+        if nodes >= budget:
+            # Bottom of the stack first: the shallowest nodes hold the largest untried subtrees
+            return SPLIT, stack
+        masks, changed = stack.pop()
+        nodes += 1
+        masks = _propagate(masks, topology, changed, subsets)
+        if masks is False:
+            continue
+        children = _children(masks, topology, policy, popcount)
+        if children is None:
+            return SOLVED, masks
+        stack.extend(reversed(children))
+    return FAILED, None
+
+
+def frontier(grid, topology, target, subsets=None, policy=None):
+    """
+    Expand a grid breadth first until there are at least target subproblems.
+    Returns:
+        A tuple (subproblems, solution): solution is the solved masks if the expansion solved the
+        grid, in which case subproblems is empty. Both are empty if the grid has no solution.
+    """
+    if policy is None:
+        policy = get_branching()
+    popcount = bitmask_solver.popcount_table(topology.n)
+    queue = deque([(bitmask_solver.grid_masks(grid, topology), None)])
+    while queue and len(queue) < target:
+        masks, changed = queue.popleft()
+        masks = _propagate(masks, topology, changed, subsets)
+        if masks is False:
+            continue
+        children = _children(masks, topology, policy, popcount)
+        if children is None:
+            return [], masks
+        queue.extend(children)
+    return list(queue), None
+
+
+def solve_parallel(grid, diagonal=True, size=3, workers=None, budget=2000, subsets=None, select='mrv',
+                   order='index'):
+    """
+    Solve one grid by searching the subtrees of its frontier in parallel.
+    Args:
+        grid(string): a string representing a sudoku grid.
+        diagonal(bool): whether the two main diagonals must hold every digit too
+        size(int): the side of a square, 3 for 9x9 boards, 4 for 16x16 and 5 for 25x25
+        workers(int): number of worker processes, None for one per CPU
+        budget(int): nodes a worker searches before handing the rest of its subtree back
+        subsets(int): largest naked and hidden subsets to propagate, None for naked twins only
+        select(string), order(string): the branching policy, see branching.py
+    Returns:
+        The dictionary representation of the solved grid. False if no solution exists.
+    """
+    topology = get_topology(diagonal, size)
+    if workers is None:
+        workers = os.cpu_count() or 1
+    subproblems, masks = frontier(grid, topology, 4 * workers, subsets, get_branching(select, order))
+    if masks is not None:
+        return bitmask_solver.masks_values(masks, topology)
+    results = Queue()
+    with Pool(workers) as pool:
+        pending = 0
+        while True:
+            for node in subproblems:
+                pool.apply_async(explore, ((node, diagonal, size, subsets, select, order, budget),),
+                                 callback=results.put, error_callback=results.put)
+                pending += 1
+            if not pending:
+                return False
+            outcome = results.get()
+            pending -= 1
+            if isinstance(outcome, BaseException):
+                raise outcome
+            kind, payload = outcome
+            if kind == SOLVED:
+                # Leaving the with block terminates the workers still searching
+                return bitmask_solver.masks_values(payload, topology)
+            subproblems = payload if kind == SPLIT else []
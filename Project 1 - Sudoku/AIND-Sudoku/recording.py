@@ -0,0 +1,73 @@
+"""
+Compact change log of the assignments made while solving, used for visualization.
+
+Instead of a full copy of the board per assignment, the log keeps one (box, old, new) tuple per
+change, optionally in a ring buffer of bounded size. Full frames are only rebuilt from the log
+when they are asked for.
+"""
+
+from collections import deque
+
+
+class ChangeLog(object):
+    """
+    Record of the (box, old, new) changes of one solve.
+    Args:
+        maxlen(int): keep at most this many changes, dropping the oldest ones. None for no limit.
+    """
+
+    def __init__(self, maxlen=None):
+        self.maxlen = maxlen
+        self._changes = deque()
+        self._base = {}
+        self._current = {}
+
+    def begin(self, values):
+        """Start a new recording from the board values, discarding any earlier changes."""
+        self._changes.clear()
+        self._base = dict(values)
+        self._current = dict(values)
+
+    def record(self, box, old, new):
+        """Append one change. When the log is full the oldest change is folded into the starting frame."""
+        if self.maxlen is not None and len(self._changes) >= self.maxlen:
+            evicted_box, evicted_old, evicted_new = self._changes.popleft()
+            self._base[evicted_box] = evicted_new
+        self._changes.append((box, old, new))
+        self._current[box] = new
+
+    def restore(self, values):
+        """
+        Record the changes that bring the logged board back to values, e.g. the board a search
+        branch started from after the branch failed.
+        """
+        current = self._current
+        for box, value in values.items():
+            if current.get(box) != value:
+                self.record(box, current.get(box), value)
+
+    def start(self):
+        """Return a copy of the board the log starts from."""
+        return dict(self._base)
+
+    def __len__(self):
+        return len(self._changes)
+
+    def __iter__(self):
+        """Generate the recorded (box, old, new) changes, oldest first."""
+        return iter(self._changes)
+
+    def frames(self, solved_only=True):
+        """
+        Rebuild full boards from the log.
+        Args:
+            solved_only(bool): only yield the boards right after a box was set to a single digit
+        Returns:
+            A generator of values dictionaries, starting with the board the log starts from.
+        """
+        frame = self.start()
+        yield dict(frame)
+        for box, old, new in self._changes:
+            frame[box] = new
+            if not solved_only or (len(new) == 1 and new != old):
+                yield dict(frame)
@@ -0,0 +1,249 @@
+"""
+Headless rendering of solve replays to images, without pygame or a window.
+
+    log = solution.record_assignments()
+    solution.solve(grid)
+    render.render_changelog(log, 'replay.png')               # animated PNG
+    render.render_changelog(log, 'frames', sequence=True)    # frames/frame_00000.png, ...
+
+The Renderer keeps one RGB canvas and the digit shown in every box. update() only redraws the
+boxes whose shown digit changed and returns the rectangle around them, so changes that only
+remove candidates cost nothing and produce no frame. The animated PNG stores just that rectangle
+for every frame after the first. Images are encoded with zlib from the standard library.
+
+Givens are drawn in black and the digits placed by the solver in blue, as in PySudoku.py.
+"""
+
+import os
+import struct
+import zlib
+
+from topology import get_topology
+
+BACKGROUND = (255, 255, 255)
+LINES = (40, 40, 40)
+GIVEN = (0, 0, 0)
+PLACED = (30, 90, 200)
+THIN, THICK = 1, 3
+
+# 3x5 glyphs of every digit up to 25x25 boards, '#' for a set pixel
+GLYPHS = {
+    '1': '.#.##..#..#.###', '2': '##...#.#.#..###', '3': '##...#.#...###.', '4': '#.##.####..#..#',
+    '5': '####..##...###.', '6': '.###..####.####', '7': '###..#.#..#..#.', '8': '####.#####.####',
+    '9': '####.####..###.', 'A': '.#.#.####.##.##', 'B': '##.#.###.#.###.', 'C': '.###..#..#...##',
+    'D': '##.#.##.##.###.', 'E': '####..##.#..###', 'F': '####..##.#..#..', 'G': '.###..#.##.#.##',
+    'H': '#.##.####.##.##', 'I': '###.#..#..#.###', 'J': '..#..#..##.#.#.', 'K': '#.##.###.#.##.#',
+    'L': '#..#..#..#..###', 'M': '#.#######.##.##', 'N': '##.#.##.##.##.#', 'O': '.#.#.##.##.#.#.',
+    'P': '##.#.###.#..#..',
+}
+
+
+def _chunk(kind, data):
+    return struct.pack('>I', len(data)) + kind + data + struct.pack('>I', zlib.crc32(kind + data) & 0xffffffff)
+
+
+def _ihdr(width, height):
+    return _chunk(b'IHDR', struct.pack('>IIBBBBB', width, height, 8, 2, 0, 0, 0))
+
+
+def _idat_data(rows):
+    """Compress rows of RGB bytes into PNG image data, without filtering."""
+    return zlib.compress(b''.join(b'\x00' + row for row in rows), 6)
+
+
+class Renderer(object):
+    """
+    Draws boards of one topology onto an RGB canvas, redrawing only the boxes that change.
+    Args:
+        topology(Topology): the board topology, the diagonal 9x9 one if None
+        cell(int): the side of a box in pixels
+    """
+
+    def __init__(self, topology=None, cell=40):
+        self.topology = topology or get_topology()
+        self.cell = cell
+        n, size = self.topology.n, self.topology.size
+        self.origins = [THICK + i * (cell + THIN) + (i // size) * (THICK - THIN) for i in range(n)]
+        self.width = self.height = self.origins[-1] + cell + THICK
+        self.canvas = [bytearray(bytes(LINES) * self.width) for _ in range(self.height)]
+        for y in self.origins:
+            for row in range(y, y + cell):
+                for x in self.origins:
+                    self.canvas[row][3 * x:3 * (x + cell)] = bytes(BACKGROUND) * cell
+        self.shown = dict.fromkeys(self.topology.boxes, '')
+        self.givens = None
+        self.frames = 0
+
+    def _draw_box(self, box, digit):
+        n = self.topology.n
+        index = self.topology.box_index[box]
+        x0, y0 = self.origins[index % n], self.origins[index // n]
+        cell = self.cell
+        for row in range(y0, y0 + cell):
+            self.canvas[row][3 * x0:3 * (x0 + cell)] = bytes(BACKGROUND) * cell
+        if not digit:
+            return
+        color = bytes(GIVEN if box in self.givens else PLACED)
+        scale = max(1, cell // 8)
+        left, top = x0 + (cell - 3 * scale) // 2, y0 + (cell - 5 * scale) // 2
+        for i, pixel in enumerate(GLYPHS[digit]):
+            if pixel == '#':
+                gx, gy = left + (i % 3) * scale, top + (i // 3) * scale
+                for row in range(gy, gy + scale):
+                    self.canvas[row][3 * gx:3 * (gx + scale)] = color * scale
+
+    def update(self, values, boxes=None):
+        """
+        Draw a board, redrawing only the boxes whose shown digit changed.
+        Args:
+            values(dict): the board in dictionary form, only single digits are drawn
+            boxes(iterable): the only boxes that may have changed since the last update, all if None
+        Returns:
+            The (x, y, width, height) rectangle that changed, None if nothing did.
+        """
+        if self.givens is None:
+            self.givens = frozenset(box for box, value in values.items() if len(value) == 1)
+            boxes = None
+        changed = []
+        for box in values if boxes is None else boxes:
+            value = values[box]
+            digit = value if len(value) == 1 else ''
+            if self.shown[box] != digit:
+                self.shown[box] = digit
+                self._draw_box(box, digit)
+                changed.append(self.topology.box_index[box])
+        if not changed and self.frames:
+            return None
+        self.frames += 1
+        if not changed:
+            return 0, 0, self.width, self.height
+        n = self.topology.n
+        xs = [self.origins[i % n] for i in changed]
+        ys = [self.origins[i // n] for i in changed]
+        return min(xs), min(ys), max(xs) + self.cell - min(xs), max(ys) + self.cell - min(ys)
+
+    def region(self, rect=None):
+        """Return the rows of RGB bytes of a rectangle of the canvas, the whole canvas if None."""
+        if rect is None:
+            return [bytes(row) for row in self.canvas]
+        x, y, width, height = rect
+        return [bytes(row[3 * x:3 * (x + width)]) for row in self.canvas[y:y + height]]
+
+
+def write_png(path, renderer):
+    """Write the whole canvas of a renderer to a PNG file."""
+    with open(path, 'wb') as f:
+        f.write(b'\x89PNG\r\n\x1a\n' + _ihdr(renderer.width, renderer.height) +
+                _chunk(b'IDAT', _idat_data(renderer.region())) + _chunk(b'IEND', b''))
+
+
+class PngSequence(object):
+    """Writes every frame as a full PNG file, directory/prefix_00000.png and so on."""
+
+    def __init__(self, directory, prefix='frame'):
+        os.makedirs(directory, exist_ok=True)
+        self.directory = directory
+        self.prefix = prefix
+        self.frames = 0
+
+    def add(self, renderer, rect):
+        write_png(os.path.join(self.directory, '{}_{:05d}.png'.format(self.prefix, self.frames)), renderer)
+        self.frames += 1
+
+    def close(self):
+        pass
+
+
+class AnimatedPng(object):
+    """
+    Writes frames to an animated PNG as they come. Every frame after the first only stores the
+    rectangle that changed, drawn over the previous frame. The frame count is patched in on close().
+    Args:
+        path(string): the file to write
+        delay(int): milliseconds every frame is shown
+    """
+
+    def __init__(self, path, delay=200):
+        self.file = open(path, 'wb')
+        self.delay = delay
+        self.frames = 0
+        self.sequence = 0
+        self.actl = None
+
+    def _fctl(self, rect):
+        x, y, width, height = rect
+        data = struct.pack('>IIIIIHHBB', self.sequence, width, height, x, y, self.delay, 1000, 0, 0)
+        self.sequence += 1
+        return _chunk(b'fcTL', data)
+
+    def add(self, renderer, rect):
+        if self.frames == 0:
+            self.file.write(b'\x89PNG\r\n\x1a\n' + _ihdr(renderer.width, renderer.height))
+            self.actl = self.file.tell()
+            self.file.write(_chunk(b'acTL', struct.pack('>II', 1, 0)))
+            rect = (0, 0, renderer.width, renderer.height)
+            self.file.write(self._fctl(rect) + _chunk(b'IDAT', _idat_data(renderer.region())))
+        else:
+            header = self._fctl(rect)
+            data = struct.pack('>I', self.sequence) + _idat_data(renderer.region(rect))
+            self.sequence += 1
+            self.file.write(header + _chunk(b'fdAT', data))
+        self.frames += 1
+
+    def close(self):
+        if self.file.closed:
+            return
+        self.file.write(_chunk(b'IEND', b''))
+        if self.actl is not None:
+            self.file.seek(self.actl)
+            self.file.write(_chunk(b'acTL', struct.pack('>II', self.frames, 0)))
+        self.file.close()
+
+
+def render_frames(boards, writer, topology=None, cell=40):
+    """
+    Render a sequence of boards, passing only the frames where a shown digit changed to writer.
+    Args:
+        boards(iterable): values dictionaries, or (values, changed boxes) pairs
+        writer(PngSequence or AnimatedPng): where the frames go, closed at the end
+        topology(Topology): the board topology, the diagonal 9x9 one if None
+        cell(int): the side of a box in pixels
+    Returns:
+        The number of frames written.
+    """
+    renderer = Renderer(topology, cell)
+    try:
+        for board in boards:
+            values, boxes = board if isinstance(board, tuple) else (board, None)
+            rect = renderer.update(values, boxes)
+            if rect is not None:
+                writer.add(renderer, rect)
+    finally:
+        writer.close()
+    return writer.frames
+
+
+def _replay(log):
+    """Generate (board, changed boxes) after every change of a ChangeLog, reusing one dictionary."""
+    values = log.start()
+    yield values, None
+    for box, old, new in log:
+        values[box] = new
+        yield values, (box,)
+
+
+def render_changelog(log, path, topology=None, cell=40, delay=200, sequence=False):
+    """
+    Render the replay of a ChangeLog from solution.record_assignments().
+    Args:
+        log(ChangeLog): the recorded changes
+        path(string): the animated PNG file to write, or the directory of the image sequence
+        topology(Topology): the board topology, the diagonal 9x9 one if None
+        cell(int): the side of a box in pixels
+        delay(int): milliseconds every frame of the animation is shown
+        sequence(bool): True to write one PNG file per frame instead of an animation
+    Returns:
+        The number of frames written.
+    """
+    writer = PngSequence(path) if sequence else AnimatedPng(path, delay)
+    return render_frames(_replay(log), writer, topology, cell)
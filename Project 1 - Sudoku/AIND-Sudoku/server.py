@@ -0,0 +1,268 @@
+"""
+Solver service on localhost: clients send grids over TCP, one per line, and get one result line
+back per grid, in the order they were sent.
+
+    python server.py --port 8765 --workers 4 --backend dlx
+    printf '%s\\nSTATS\\n' "$GRID" | nc localhost 8765
+
+The result lines are those of cli.py: the solved grid string, 'unsolvable' or 'error: ...'.
+The line STATS is answered with the service metrics as one JSON object.
+
+Grids from every connection go into one queue. Once a batch slot is free, the batcher takes the
+oldest grid, waits up to window seconds for more to arrive, and sends up to max_batch grids at a
+time to the worker pool. While every slot is busy the queue fills up, so the batches grow with the
+load. Clients may send many grids without waiting for the results.
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from functools import partial
+
+from batch import solve_many
+from cli import format_result, percentile
+from topology import get_topology
+
+HOST = '127.0.0.1'
+PORT = 8765
+
+
+class SolverService(object):
+    """
+    Batches grids from any number of clients and solves them on a worker pool.
+    Args:
+        workers(int): worker processes, None for one per CPU, 1 for a single thread of this process
+        max_batch(int): most grids sent to a worker at a time
+        window(float): seconds the batcher waits for more grids before sending a batch
+        diagonal(bool): whether the two main diagonals must hold every digit too
+        size(int): the side of a square, 3 for 9x9 boards
+        **options: keyword arguments passed on to solution.solve(), e.g. backend='dlx'
+    """
+
+    def __init__(self, workers=1, max_batch=32, window=0.005, diagonal=True, size=3, **options):
+        self.workers = workers or os.cpu_count() or 1
+        self.max_batch = max_batch
+        self.window = window
+        self.topology = get_topology(diagonal, size)
+        self.options = dict(options, diagonal=diagonal, size=size)
+        self.queue = None
+        self.executor = None
+        self.slots = None
+        self.batcher = None
+        self.running = set()
+        self.connections = {}
+        # Metrics
+        self.requests = 0
+        self.batches = 0
+        self.batched = 0
+        self.largest_batch = 0
+        self.max_queue_depth = 0
+        self.latencies = deque(maxlen=1000)
+
+    async def start(self):
+        """Create the worker pool and start batching."""
+        self.queue = asyncio.Queue()
+        if self.workers == 1:
+            self.executor = ThreadPoolExecutor(1)
+        else:
+            self.executor = ProcessPoolExecutor(self.workers)
+        # Two batches per worker: one solving and one ready to go
+        self.slots = asyncio.Semaphore(2 * self.workers)
+        self.batcher = asyncio.ensure_future(self._batch())
+
+    async def close(self):
+        """
+        Stop batching, let the batches already sent finish, hang up on the clients still
+        connected and shut the worker pool down.
+        """
+        self.batcher.cancel()
+        try:
+            await self.batcher
+        except asyncio.CancelledError:
+            pass
+        while not self.queue.empty():
+            grid, future, queued = self.queue.get_nowait()
+            future.set_exception(RuntimeError('service closed'))
+        if self.running:
+            await asyncio.wait(self.running)
+        for writer in self.connections.values():
+            writer.close()
+        if self.connections:
+            await asyncio.wait(list(self.connections))
+        self.executor.shutdown()
+
+    async def solve(self, grid):
+        """Queue one grid. Returns its batch.SolveResult once solved."""
+        future = asyncio.get_running_loop().create_future()
+        await self.queue.put((grid, future, time.perf_counter()))
+        self.requests += 1
+        self.max_queue_depth = max(self.max_queue_depth, self.queue.qsize())
+        return await future
+
+    async def _batch(self):
+        while True:
+            await self.slots.acquire()
+            items = [await self.queue.get()]
+            if self.window and self.queue.qsize() < self.max_batch - 1:
+                try:
+                    await asyncio.sleep(self.window)
+                except asyncio.CancelledError:
+                    items[0][1].set_exception(RuntimeError('service closed'))
+                    raise
+            while len(items) < self.max_batch and not self.queue.empty():
+                items.append(self.queue.get_nowait())
+            task = asyncio.ensure_future(self._run(items))
+            self.running.add(task)
+            task.add_done_callback(self.running.discard)
+
+    async def _run(self, items):
+        grids = [grid for grid, future, queued in items]
+        self.batches += 1
+        self.batched += len(items)
+        self.largest_batch = max(self.largest_batch, len(items))
+        try:
+            solve = partial(solve_many, grids, 1, **self.options)
+            results = await asyncio.get_running_loop().run_in_executor(self.executor, solve)
+        except Exception as e:
+            for grid, future, queued in items:
+                if not future.done():
+                    future.set_exception(e)
+            return
+        finally:
+            self.slots.release()
+        now = time.perf_counter()
+        for (grid, future, queued), result in zip(items, results):
+            self.latencies.append(now - queued)
+            if not future.done():
+                future.set_result(result)
+
+    def metrics(self):
+        """
+        Return the service metrics: requests and batches so far, the current and largest queue
+        depth, the mean and largest batch size, and percentiles in milliseconds of the time from
+        queueing a grid to its result, over the last 1000 grids.
+        """
+        result = {'requests': self.requests, 'batches': self.batches,
+                  'queue_depth': self.queue.qsize() if self.queue else 0, 'max_queue_depth': self.max_queue_depth,
+                  'batches_running': len(self.running),
+                  'mean_batch_size': self.batched / self.batches if self.batches else 0.0,
+                  'max_batch_size': self.largest_batch}
+        if self.latencies:
+            ordered = sorted(self.latencies)
+            for name, fraction in (('p50', 0.5), ('p90', 0.9), ('p99', 0.99), ('max', 1.0)):
+                result['latency_{}_ms'.format(name)] = percentile(ordered, fraction) * 1000
+        return result
+
+    async def _respond(self, request):
+        result = await self.solve(request)
+        return format_result(result, self.topology)
+
+    async def handle(self, reader, writer):
+        """Serve one connection: answer every line in order until the client closes it."""
+        answers = asyncio.Queue()
+
+        async def write_answers():
+            while True:
+                answer = await answers.get()
+                if answer is None:
+                    return
+                if not isinstance(answer, str):
+                    try:
+                        answer = await answer
+                    except Exception as e:
+                        answer = 'error: {}: {}'.format(type(e).__name__, e)
+                writer.write(answer.encode() + b'\n')
+                await writer.drain()
+
+        writer_task = asyncio.ensure_future(write_answers())
+        connection = asyncio.current_task()
+        self.connections[connection] = writer
+        try:
+            while True:
+                line = await reader.readline()
+                if not line:
+                    break
+                request = line.decode(errors='replace').strip()
+                if not request:
+                    continue
+                if request.upper() == 'STATS':
+                    await answers.put(json.dumps(self.metrics()))
+                else:
+                    await answers.put(asyncio.ensure_future(self._respond(request)))
+            await answers.put(None)
+            await writer_task
+        except ConnectionError:
+            pass
+        finally:
+            del self.connections[connection]
+            writer_task.cancel()
+            writer.close()
+
+
+async def serve(service, host=HOST, port=PORT):
+    """Start service and return its asyncio server, listening on host and port (0 for any free port)."""
+    await service.start()
+    return await asyncio.start_server(service.handle, host, port)
+
+
+async def query(lines, host=HOST, port=PORT):
+    """
+    Send lines to a running service in one go and return its answers.
+    Args:
+        lines(iterable): grids, or STATS
+    Returns:
+        The list of answer lines, one per non-blank line sent.
+    """
+    requests = [line.strip() for line in lines if line.strip()]
+    reader, writer = await asyncio.open_connection(host, port)
+    writer.write(''.join(request + '\n' for request in requests).encode())
+    await writer.drain()
+    answers = [(await reader.readline()).decode().rstrip('\n') for _ in requests]
+    writer.close()
+    await writer.wait_closed()
+    return answers
+
+
+async def _main(args, options):
+    service = SolverService(args.workers or None, args.max_batch, args.window / 1000, not args.standard, args.size,
+                            **options)
+    server = await serve(service, args.host, args.port)
+    print('Serving on {}:{}'.format(*server.sockets[0].getsockname()[:2]), flush=True)
+    try:
+        async with server:
+            await server.serve_forever()
+    finally:
+        await service.close()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Serve the Sudoku solver over TCP, one grid per line.')
+    parser.add_argument('--host', default=HOST, help='address to listen on (default {})'.format(HOST))
+    parser.add_argument('--port', type=int, default=PORT)
+    parser.add_argument('--workers', type=int, default=1, help='worker processes, 0 for one per CPU (default 1)')
+    parser.add_argument('--max-batch', type=int, default=32, help='most grids sent to a worker at a time')
+    parser.add_argument('--window', type=float, default=5.0, help='milliseconds to wait for a batch to fill')
+    parser.add_argument('--backend', choices=('bitmask', 'dlx', 'string'), default='bitmask')
+    parser.add_argument('--propagation', choices=('sweep', 'worklist'), default='worklist',
+                        help='bitmask backend only')
+    parser.add_argument('--backtracking', choices=('copy', 'trail'), default='trail', help='bitmask backend only')
+    parser.add_argument('--subsets', type=int, help='largest naked and hidden subsets to propagate (bitmask)')
+    parser.add_argument('--standard', action='store_true', help='standard rules, without the diagonal units')
+    parser.add_argument('--size', type=int, default=3, help='box size: 3 for 9x9, 4 for 16x16, 5 for 25x25')
+    args = parser.parse_args(argv)
+
+    options = {'backend': args.backend, 'subsets': args.subsets}
+    if args.backend == 'bitmask':
+        options.update(propagation=args.propagation, backtracking=args.backtracking)
+    try:
+        asyncio.run(_main(args, options))
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == '__main__':
+    main()
@@ -1,7 +1,19 @@
 import sys
+from time import perf_counter
+
+import bitmask_solver
+import dlx_solver
+import parallel_search
+from digit_places import DigitPlaces
+from recording import ChangeLog
+from stats import SolverStats
+from topology import cross, get_topology
 
 # Global Variables
-assignments = []
+# The board tables are kept as module globals for existing callers only, the solver functions
+# below read them from the topology they are given (the diagonal one by default).
+# recorder is the ChangeLog that assign_value() writes to, None while recording is off.
+recorder = None
 boxes = []
 row_unit = []
 col_unit = []
@@ -15,36 +27,53 @@ hasBeenInitialized = False
 def assign_value(values, box, value):
     """
     Please use this function to update your values dictionary!
-    Assigns a value to a given box. If it updates the board record it.
+    Assigns a value to a given box. If it updates the board and recording is on, record it.
     """
 
     # Don't waste memory appending actions that don't actually change any values
     if values[box] == value:
         return values
 
+    if recorder is not None:
+        recorder.record(box, values[box], value)
     values[box] = value
-    if len(value) == 1:
-        assignments.append(values.copy())
     return values
 
-def naked_twins(values):
+def record_assignments(maxlen=None):
+    """
+    Turn on recording of the assignments made by the string backend, for visualize_assignments().
+    Each solve() starts a new recording.
+    Args:
+        maxlen(int): keep only the most recent maxlen changes. None for no limit.
+    Returns:
+        The ChangeLog the changes are written to.
+    """
+    global recorder
+    recorder = ChangeLog(maxlen)
+    return recorder
+
+def stop_recording():
+    """Turn recording off again. Solves are not recorded by default."""
+    global recorder
+    recorder = None
+
+def naked_twins(values, topology=None):
     """Eliminate values using the naked twins strategy.
     Args:
         values(dict): a dictionary of the form {'box_name': '123456789', ...}
+        topology(Topology): the board topology, the diagonal one if None
 
     Returns:
         the values dictionary with the naked twins eliminated from peers.
     """
-
-    # Check if the initialize function has already been called.
-    if hasBeenInitialized is False:
-        initialize()
+    if topology is None:
+        topology = get_topology()
     
     # Stores the list of naked twins
     list_of_naked_twins = {}
 
     # This for loop is used to find all the naked twins
-    for unit in unit_list:
+    for unit in topology.unit_list:
         # box_value_count dictionary stores the number of times a value repeats in a unit
         box_value_count = {}
         for box in unit:
@@ -61,10 +90,12 @@ def naked_twins(values):
                     list_of_naked_twins[value].append(box_list)
     
     # This for loop is used to eliminate the digits of naked twins from the respective unit.
+    # Only the units of the first twin can hold both, so they are looked up instead of scanning unit_list.
     for value, unit_lists_for_value in list_of_naked_twins.items():
         for unit_list_for_value in unit_lists_for_value:
-            for unit in unit_list:
-                if all(x in unit for x in unit_list_for_value):
+            first, second = unit_list_for_value
+            for unit in topology.units[first]:
+                if second in unit:
                     for box in unit:
                         if box not in unit_list_for_value:
                             for digit in value:
@@ -73,158 +104,303 @@ def naked_twins(values):
 
     return values
 
-def cross(A, B):
-    "Cross product of elements in A and elements in B."
-    return [s + t for s in A for t in B]
-
-def grid_values(grid):
+def grid_values(grid, topology=None):
     """
     Convert grid into a dict of {square: char} with '123456789' for empties.
     Args:
         grid(string) - A grid in string form.
+        topology(Topology) - the board topology, the diagonal 9x9 one if None
     Returns:
         A grid in dictionary form
             Keys: The boxes, e.g., 'A1'
-            Values: The value in each box, e.g., '8'. If the box has no value, then the value will be '123456789'.
+            Values: The value in each box, e.g., '8'. If the box has no value, then the value will be '123456789'
+                (every digit of the topology on larger boards).
     """
-    assert len(grid) == 81
+    if topology is None:
+        topology = get_topology()
+    assert len(grid) == len(topology.boxes)
     
     values = []
     for value in grid:
         if value == '.':
-            values.append('123456789')
+            values.append(topology.digits)
         else:
             values.append(value)
-    assert len(values) == 81
-    return dict(zip(boxes, values))
+    assert len(values) == len(topology.boxes)
+    return dict(zip(topology.boxes, values))
 
 
 
-def display(values):
+def display(values, topology=None):
     """
     Display the values as a 2-D grid.
     Args:
         values(dict): The sudoku in dictionary form
+        topology(Topology): the board topology, the diagonal one if None
     """
-    width = 1+max(len(values[s]) for s in boxes)
-    line = '+'.join(['-'*(width*3)]*3)
-    for r in row_string:
-        print(''.join(values[r+c].center(width)+('|' if c in '36' else '')
-                      for c in col_string))
-        if r in 'CF': print(line)
+    if topology is None:
+        topology = get_topology()
+    size = topology.size
+    width = 1+max(len(values[s]) for s in topology.boxes)
+    line = '+'.join(['-'*(width*size)]*size)
+    # Columns and rows that close a square, except the last ones
+    col_ends = topology.cols[size-1:-1:size]
+    row_ends = topology.rows[size-1:-1:size]
+    for r in topology.rows:
+        print(''.join(values[r+c].center(width)+('|' if c in col_ends else '')
+                      for c in topology.cols))
+        if r in row_ends: print(line)
     return
 
 
-def eliminate(values):
+def eliminate(values, topology=None):
     """
     Go over all the boxes in the sudoku. If there is a box with only one digit, then remove this digit 
     from all the units that it belongs to
     Args:
         values(dict): The sudoku in dictionary form
+        topology(Topology): the board topology, the diagonal one if None
     Return:
         Sudoku in dictionary form after making changes
     """
-    list_of_keys_with_size_1 = [box for box in values.keys() if len(values[box]) == 1]
-    for box in list_of_keys_with_size_1:
-        for peer in peers[box]:
-            # values[peer] = values[peer].replace(values[box], '')
-            values = assign_value(values, peer, values[peer].replace(values[box], ''))
+    if topology is None:
+        topology = get_topology()
+    boxes, peers = topology.boxes, topology.index_peers
+    cells = [values[box] for box in boxes]
+    list_of_keys_with_size_1 = [i for i, value in enumerate(cells) if len(value) == 1]
+    for i in list_of_keys_with_size_1:
+        digit = cells[i]
+        for j in peers[i]:
+            if digit and digit in cells[j]:
+                cells[j] = cells[j].replace(digit, '')
+                values = assign_value(values, boxes[j], cells[j])
     return values
 
-def only_choice(values):
+def only_choice(values, topology=None):
     """
     Go through all the boxes in the sudoku. If in any box there is a digit such that it only occurs once in a 
     particular unit, then set the confirm value of that box as the digit.
+    A DigitPlaces board already knows which unit and digit pairs are down to one box, so only those
+    are visited instead of every unit and digit.
     Args:
         values(dict): The sudoku in dictionary form
+        topology(Topology): the board topology, the diagonal one if None
     Return:
         Sudoku in dictionary form after making changes
     """
-    for unit in unit_list:
-        for digit in '123456789':
-            digit_list = [box for box in unit if digit in values[box]]
+    if isinstance(values, DigitPlaces):
+        single = values.pop_single()
+        while single is not None:
+            values = assign_value(values, single[0], single[1])
+            single = values.pop_single()
+        return values
+    if topology is None:
+        topology = get_topology()
+    boxes = topology.boxes
+    cells = [values[box] for box in boxes]
+    for unit in topology.index_units:
+        for digit in topology.digits:
+            digit_list = [i for i in unit if digit in cells[i]]
             if len(digit_list) == 1:
-                # values[digit_list[0]] = digit
-                values = assign_value(values, digit_list[0], digit)
+                cells[digit_list[0]] = digit
+                values = assign_value(values, boxes[digit_list[0]], digit)
     return values
 
-def reduce_puzzle(values):
+def reduce_puzzle(values, topology=None, stats=None):
     """
     Perform eliminate(), naked_twins() and only_choice() until they stop offering any change to the input sudoku
     Args:
         values(dict): The sudoku in dictionary form
+        topology(Topology): the board topology, the diagonal one if None
+        stats(SolverStats): if given, the calls, effect and time of every strategy are added to it
     Return:
         Sudoku in dictionary form after making changes
     """
+    if topology is None:
+        topology = get_topology()
+    if stats is not None:
+        def count():
+            return sum(len(v) for v in values.values()), sum(1 for v in values.values() if len(v) == 1)
     stalled = False
     while not stalled:
         solved_values_before = len([box for box in values.keys() if len(values[box]) == 1])
-        values = eliminate(values)
-        values = naked_twins(values)
-        values = only_choice(values)
+        if stats is None:
+            values = eliminate(values, topology)
+            values = naked_twins(values, topology)
+            values = only_choice(values, topology)
+        else:
+            # The strategies change values in place, so count() keeps seeing the current board
+            stats.run('eliminate', count, eliminate, values, topology)
+            stats.run('naked_twins', count, naked_twins, values, topology)
+            stats.run('only_choice', count, only_choice, values, topology)
         solved_values_after = len([box for box in values.keys() if len(values[box]) == 1])
         stalled = solved_values_before == solved_values_after
         if len([box for box in values.keys() if len(values[box]) == 0]):
             return False
     return values
 
-def search(values):
+def search(values, topology=None, stats=None, depth=0):
     """
     Call reduce_puzzle() and if the sudoku returned is not solved then apply Depth-First Search to assume value
     in the box with the least number of digits (!= 1) and go ahead solving it by calling search() with the new sudoku
     Args:
         values(dict): The sudoku in dictionary form
+        topology(Topology): the board topology, the diagonal one if None
+        stats(SolverStats): if given, strategy and branching statistics are added to it
+        depth(int): the number of guesses made above this call
     Return:
         Sudoku in dictionary form after making changes
     """
-    values = reduce_puzzle(values)
+    if topology is None:
+        topology = get_topology()
+    values = reduce_puzzle(values, topology, stats)
     if values is False:
         return False
+    boxes = topology.boxes
     if all(len(values[s]) == 1 for s in boxes):
         return values
+    if stats is not None:
+        stats.branch(depth)
     n, s = min((len(values[s]), s) for s in boxes if len(values[s]) > 1)
     for value in values[s]:
+        if recorder is not None:
+            # Replay from the board this branch starts from, not from the last failed branch
+            recorder.restore(values)
         new_sudoku = values.copy()
-        new_sudoku[s] = value
-        attempt = search(new_sudoku)
+        new_sudoku = assign_value(new_sudoku, s, value)
+        attempt = search(new_sudoku, topology, stats, depth + 1)
         if attempt:
             return attempt
+        if stats is not None:
+            stats.backtracks += 1
 
-def solve(grid):
+def solve(grid, backend='string', propagation='sweep', backtracking='copy', diagonal=True, subsets=None, size=3,
+          stats=False, cache=None, select='mrv', order='index', workers=1):
     """
     Find the solution to a Sudoku grid.
     Args:
         grid(string): a string representing a sudoku grid.
             Example: '2.............62....1....7...6..8...3...9...7...6..4...4....8....52.............3'
+        backend(string): 'string' for the dictionary of strings solver below, 'bitmask' for the
+            integer mask engine in bitmask_solver.py, 'dlx' for the dancing links exact cover
+            solver in dlx_solver.py. All of them return the same dictionary format.
+        propagation(string): 'sweep' to rerun every strategy over the whole board until it stalls,
+            'worklist' to revisit only the peers and units of the boxes that changed (bitmask backend).
+        backtracking(string): 'copy' to copy the board for every branch of search(), 'trail' to work
+            on one shared board and undo the changes of failed branches (bitmask backend, worklist only).
+        diagonal(bool): whether the two main diagonals must hold every digit too
+        subsets(int): also propagate naked and hidden subsets (pairs, triples, quads) up to this
+            size before branching (bitmask backend).
+        size(int): the side of a square: 3 for 9x9 boards, 4 for 16x16 and 5 for 25x25. Digits past 9
+            are written as letters, e.g. '123456789ABCDEFG' on a 16x16 board.
+        stats(bool): True to also count the calls, eliminations and time of every strategy and the
+            branch points, backtracks and depth of the search (string and bitmask backends).
+        cache(SolutionCache): if given, puzzles isomorphic to one solved before are answered from
+            the cache without searching again, see canonical.py.
+        select(string): the box to branch on: 'mrv' for the fewest candidates, 'degree' to break
+            ties by the most open peers (bitmask backend), see branching.py.
+        order(string): the order to try its digits in: 'index', 'lcv' for the least constraining
+            digit first or 'frequency' for the most placed digit first (bitmask backend).
+        workers(int): processes searching the subtrees of one hard grid in parallel, None for one
+            per CPU (bitmask backend, worklist propagation), see parallel_search.py.
     Returns:
         The dictionary representation of the final sudoku grid. False if no solution exists.
+        A (values, SolverStats) tuple if stats is True, see stats.py.
     """
-    initialize()
-    values = grid_values(grid)
-    values = search(values)
-    return values
+    if cache is not None:
+        if stats:
+            raise ValueError("Statistics cannot be collected through the cache")
+        return cache.solve(grid, lambda puzzle: solve(puzzle, backend, propagation, backtracking, diagonal, subsets,
+                                                      size, select=select, order=order, workers=workers),
+                           diagonal, size)
+    if backend == 'bitmask' and workers != 1:
+        if propagation != 'worklist' or stats:
+            raise ValueError("Parallel search needs 'worklist' propagation and does not collect statistics")
+        return parallel_search.solve_parallel(grid, diagonal, size, workers, subsets=subsets, select=select,
+                                              order=order)
+    if backend == 'bitmask':
+        return bitmask_solver.solve(grid, diagonal, propagation=propagation, backtracking=backtracking,
+                                    subsets=subsets, size=size, stats=stats, select=select, order=order)
+    if backend not in ('dlx', 'string'):
+        raise ValueError("Unknown backend: {}".format(backend))
+    if select != 'mrv' or order != 'index' or workers != 1:
+        raise ValueError("Branching policies and parallel search are only supported by the bitmask backend")
+    if backend == 'dlx':
+        if stats:
+            raise ValueError("The dlx backend does not collect statistics")
+        return dlx_solver.solve(grid, diagonal, size)
+    if propagation != 'sweep' or backtracking != 'copy' or subsets:
+        raise ValueError("The string backend only supports 'sweep' propagation, 'copy' backtracking and naked twins")
+    topology = get_topology(diagonal, size)
+    values = grid_values(grid, topology)
+    if recorder is not None:
+        recorder.begin(values)
+    values = DigitPlaces(values, topology)
+    solver_stats = SolverStats() if stats else None
+    start = perf_counter()
+    values = search(values, topology, solver_stats)
+    if values:
+        values = dict(values)
+    if not stats:
+        return values
+    solver_stats.seconds += perf_counter() - start
+    return values, solver_stats
+
+def count_solutions(grid, limit=2, backend='bitmask', diagonal=True, size=3, subsets=None, workers=1):
+    """
+    Count the solutions of a Sudoku grid, stopping as soon as limit of them have been found.
+    Args:
+        grid(string): a string representing a sudoku grid.
+        limit(int): the largest count of interest, None to count every solution
+        backend(string): 'bitmask' to count with the worklist propagation and trail of the bitmask
+            engine, 'dlx' to count with dancing links
+        diagonal(bool): whether the two main diagonals must hold every digit too
+        size(int): the side of a square, 3 for 9x9 boards
+        subsets(int): also propagate naked and hidden subsets up to this size (bitmask backend)
+        workers(int): processes counting the branches of the first guess in parallel, None for one
+            per CPU (bitmask backend)
+    Returns:
+        The number of solutions found, at most limit.
+    """
+    if backend == 'bitmask':
+        return bitmask_solver.count_solutions(grid, limit, diagonal, size, subsets, workers)
+    if backend == 'dlx':
+        if subsets or workers != 1:
+            raise ValueError("The dlx backend counts in one process without subsets")
+        return dlx_solver.count(grid, limit, diagonal, size)
+    raise ValueError("Unknown backend: {}".format(backend))
+
+def is_unique(grid, **options):
+    """
+    Check that a Sudoku grid has exactly one solution. Counting stops at the second solution.
+    Takes the same keyword arguments as count_solutions().
+    """
+    return count_solutions(grid, 2, **options) == 1
 
 def initialize():
     """
-    Used to initialize all the global variables that we will need
+    Used to initialize all the global variables from the shared diagonal topology.
+    Calling it again is harmless, the tables are built only once.
     """
     global boxes, row_unit, col_unit, square_unit, unit_list, units, peers, row_string, col_string, diag_unit, hasBeenInitialized
-    row_string = 'ABCDEFGHI'
-    col_string = '123456789'
-    boxes = cross(row_string, col_string).copy()
-    row_unit = [cross(r, col_string) for r in row_string]
-    col_unit = [cross(row_string, c) for c in col_string]
-    diag_unit.append([row_string[i] + col_string[i] for i in range(9)])
-    diag_unit.append([row_string[8-i] + col_string[i] for i in range(9)])
-    square_unit = [cross(rs, cs) for rs in ['ABC', 'DEF', 'GHI'] for cs in ['123', '456', '789']]
-    unit_list = row_unit + col_unit + square_unit + diag_unit
-    # unit_list = row_unit + col_unit + square_unit
-    units = dict((s, [t for t in unit_list if s in t]) for s in boxes)
-    peers = dict((s, set(sum(units[s], [])) - set([s])) for s in boxes)
+    topology = get_topology()
+    row_string = topology.rows
+    col_string = topology.cols
+    boxes = list(topology.boxes)
+    row_unit = list(topology.row_units)
+    col_unit = list(topology.col_units)
+    diag_unit = list(topology.diag_units)
+    square_unit = list(topology.square_units)
+    unit_list = list(topology.unit_list)
+    units = topology.units
+    peers = topology.peers
     hasBeenInitialized = True
 
+initialize()
+
 if __name__ == '__main__':
     diag_sudoku_grid = '.8..794...........3..5..9........1..........2..........72......8.1.....7...4.7.1.'
+    assignments = record_assignments()
     display(solve(diag_sudoku_grid))
     try:
         from visualize import visualize_assignments
@@ -0,0 +1,92 @@
+"""
+Counters and timings filled in by the solvers when asked for, e.g.
+
+    values, stats = solution.solve(grid, backend='bitmask', stats=True)
+    print(stats.report())
+
+Every solver function takes stats=None and only touches it when it is given one, so
+solves without statistics do not pay for them.
+"""
+
+from time import perf_counter
+
+
+class StrategyStats(object):
+    """Totals for one propagation strategy."""
+    __slots__ = ('calls', 'removed', 'fixed', 'seconds')
+
+    def __init__(self):
+        self.calls = 0
+        self.removed = 0
+        self.fixed = 0
+        self.seconds = 0.0
+
+    def as_dict(self):
+        return {'calls': self.calls, 'removed': self.removed, 'fixed': self.fixed, 'seconds': self.seconds}
+
+
+class SolverStats(object):
+    """
+    Statistics of one or more solves.
+        strategies: strategy name -> StrategyStats with its calls, candidates removed,
+            boxes fixed and wall time
+        branch_points: search nodes that had to guess a digit
+        backtracks: guesses that led to a contradiction
+        max_depth: deepest guess, the root being depth 0
+        undone: changes rolled back by trail backtracking
+        seconds: total wall time of the solves
+    """
+
+    def __init__(self):
+        self.strategies = {}
+        self.branch_points = 0
+        self.backtracks = 0
+        self.max_depth = 0
+        self.undone = 0
+        self.seconds = 0.0
+
+    def run(self, name, count, function, *args):
+        """
+        Call function(*args) and charge its time and effect to the strategy name.
+        Args:
+            name(string): the strategy name, e.g. 'eliminate'
+            count(callable): returns the (candidates, solved boxes) of the board function changes
+            function(callable): the strategy
+        Returns:
+            The value returned by function.
+        """
+        candidates, solved = count()
+        start = perf_counter()
+        result = function(*args)
+        seconds = perf_counter() - start
+        candidates_after, solved_after = count()
+        strategy = self.strategies.get(name)
+        if strategy is None:
+            strategy = self.strategies[name] = StrategyStats()
+        strategy.calls += 1
+        strategy.removed += candidates - candidates_after
+        strategy.fixed += solved_after - solved
+        strategy.seconds += seconds
+        return result
+
+    def branch(self, depth):
+        """Count a branch point at the given depth."""
+        self.branch_points += 1
+        if depth > self.max_depth:
+            self.max_depth = depth
+
+    def as_dict(self):
+        """Return the statistics as plain dictionaries, e.g. to dump them as JSON."""
+        return {'strategies': dict((name, strategy.as_dict()) for name, strategy in self.strategies.items()),
+                'branch_points': self.branch_points, 'backtracks': self.backtracks,
+                'max_depth': self.max_depth, 'undone': self.undone, 'seconds': self.seconds}
+
+    def report(self):
+        """Return a short human readable summary."""
+        lines = ['{:<12} {:>8} {:>9} {:>7} {:>10}'.format('strategy', 'calls', 'removed', 'fixed', 'ms')]
+        for name, strategy in sorted(self.strategies.items()):
+            lines.append('{:<12} {:>8} {:>9} {:>7} {:>10.3f}'.format(name, strategy.calls, strategy.removed,
+                                                                     strategy.fixed, strategy.seconds * 1000))
+        lines.append('branch points {}, backtracks {}, max depth {}, undone {}, total {:.3f} ms'.format(
+            self.branch_points, self.backtracks, self.max_depth, self.undone, self.seconds * 1000))
+        return '\n'.join(lines)
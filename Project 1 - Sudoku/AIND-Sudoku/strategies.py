@@ -0,0 +1,165 @@
+"""
+Naked and hidden subset strategies for the bitmask engine.
+
+A naked subset is a group of k boxes of a unit whose candidates together are only k digits:
+those digits can be removed from every other box of the unit. A hidden subset is a group of k
+digits that together fit in only k boxes of a unit: every other digit can be removed from those
+boxes. Naked twins is the naked subset of size 2, only_choice() the hidden subset of size 1.
+
+For each unit the strategies index the open boxes by candidate mask and the digits by the
+positions where they still fit, and only combine entries that can still form a subset.
+
+The popcount arguments default to the 9x9 lookup table, bitmask_solver.popcount_table()
+gives the one for larger boards.
+"""
+
+POPCOUNT = [bin(m).count('1') for m in range(512)]
+
+
+def _subsets(masks, size, popcount):
+    """
+    Generate every combination of exactly size entries of masks whose union has at most size bits.
+    Yields (chosen indices, union) pairs. Combinations are pruned as soon as the union is too large.
+    """
+    chosen = []
+
+    def extend(start, union):
+        if len(chosen) == size:
+            yield list(chosen), union
+            return
+        for i in range(start, len(masks)):
+            grown = union | masks[i]
+            if popcount[grown] <= size:
+                chosen.append(i)
+                yield from extend(i + 1, grown)
+                chosen.pop()
+
+    return extend(0, 0)
+
+
+def unit_index(masks, unit, popcount=POPCOUNT):
+    """
+    Index a unit of the board.
+    Args:
+        masks(list): the candidate masks of the board
+        unit(tuple): the box indices of the unit
+        popcount(list): the popcount lookup table of the board
+    Returns:
+        A tuple (by_mask, positions): by_mask maps each candidate mask of an open box to the list
+        of boxes holding exactly that mask, positions[d] is a mask of the positions within the
+        unit where digit d + 1 still fits.
+    """
+    by_mask = {}
+    positions = [0] * len(unit)
+    for i, box in enumerate(unit):
+        mask = masks[box]
+        if popcount[mask] > 1:
+            by_mask.setdefault(mask, []).append(box)
+        d = 0
+        while mask:
+            if mask & 1:
+                positions[d] |= 1 << i
+            mask >>= 1
+            d += 1
+    return by_mask, positions
+
+
+def _set(masks, box, mask, trail, changed):
+    if trail is not None:
+        trail.append((box, masks[box]))
+    masks[box] = mask
+    changed.append(box)
+
+
+def naked_subsets(masks, unit, size, trail=None, by_mask=None, popcount=POPCOUNT):
+    """
+    Remove the digits of every naked subset of the given size from the rest of the unit.
+    Args:
+        masks(list): the candidate masks of the board, changed in place
+        unit(tuple): the box indices of the unit
+        size(int): the number of boxes in the subset, 2 to 4
+        trail(Trail): if given, every change is recorded on it
+        by_mask(dict): the by_mask index from unit_index(), built here if None
+        popcount(list): the popcount lookup table of the board
+    Returns:
+        The list of boxes that changed, or False if some size boxes share fewer than size digits.
+    """
+    if by_mask is None:
+        by_mask = unit_index(masks, unit, popcount)[0]
+    changed = []
+    open_masks = []
+    open_boxes = []
+    for mask, holders in by_mask.items():
+        if popcount[mask] <= size:
+            # Boxes with exactly the same candidates are counted once per box
+            if len(holders) > popcount[mask]:
+                return False
+            open_masks.extend([mask] * len(holders))
+            open_boxes.extend(holders)
+    for chosen, union in _subsets(open_masks, size, popcount):
+        if popcount[union] < size:
+            return False
+        members = [open_boxes[i] for i in chosen]
+        keep = ~union
+        for box in unit:
+            if box not in members and masks[box] & union:
+                mask = masks[box] & keep
+                if not mask:
+                    return False
+                _set(masks, box, mask, trail, changed)
+    return changed
+
+
+def hidden_subsets(masks, unit, size, trail=None, positions=None, popcount=POPCOUNT):
+    """
+    Restrict the boxes of every hidden subset of the given size to the digits of the subset.
+    Args:
+        masks(list): the candidate masks of the board, changed in place
+        unit(tuple): the box indices of the unit
+        size(int): the number of digits in the subset, 2 to 4
+        trail(Trail): if given, every change is recorded on it
+        positions(list): the positions index from unit_index(), built here if None
+        popcount(list): the popcount lookup table of the board
+    Returns:
+        The list of boxes that changed, or False if some size digits fit in fewer than size boxes.
+    """
+    if positions is None:
+        positions = unit_index(masks, unit, popcount)[1]
+    changed = []
+    open_digits = [d for d in range(len(unit)) if popcount[positions[d]] > 1]
+    open_positions = [positions[d] for d in open_digits]
+    for chosen, union in _subsets(open_positions, size, popcount):
+        if popcount[union] < size:
+            return False
+        digit_mask = 0
+        for i in chosen:
+            digit_mask |= 1 << open_digits[i]
+        for i, box in enumerate(unit):
+            if union & (1 << i) and masks[box] & ~digit_mask:
+                mask = masks[box] & digit_mask
+                if not mask:
+                    return False
+                _set(masks, box, mask, trail, changed)
+    return changed
+
+
+def subsets(masks, unit, max_size, trail=None, popcount=POPCOUNT):
+    """
+    Apply the naked and hidden subsets of every size from 2 to max_size to one unit.
+    Returns:
+        The list of boxes that changed, or False on a contradiction.
+    """
+    changed = []
+    for size in range(2, max_size + 1):
+        by_mask, positions = unit_index(masks, unit, popcount)
+        found = naked_subsets(masks, unit, size, trail, by_mask, popcount)
+        if found is False:
+            return False
+        changed.extend(found)
+        if found:
+            positions = unit_index(masks, unit, popcount)[1]
+        found = hidden_subsets(masks, unit, size, trail, positions, popcount)
+        if found is False:
+            return False
+        changed.extend(found)
+    return changed
@@ -1,5 +1,44 @@
 import solution
+import batch
+import benchmark
+import bitmask_solver
+import branching
+import canonical
+import digit_places
+import generator
+import parallel_search
+import render
+import server
+import cli
+import asyncio
+import io
+import json
+import dlx_solver
+import strategies
+import topology
+import os
+import struct
+import tempfile
 import unittest
+import zlib
+import vector_solver
+
+
+def is_solution(values, grid, diagonal=True, size=3):
+    """Check that values fills every unit with every digit and keeps the clues of grid."""
+    if not values:
+        return False
+    board = topology.get_topology(diagonal, size)
+    if any(sorted(values[box] for box in unit) != sorted(board.digits) for unit in board.unit_list):
+        return False
+    return all(clue in ('.', values[box]) for box, clue in zip(board.boxes, grid))
+
+
+def large_puzzle(size, diagonal):
+    """Return a puzzle of the given box size with every third box of a full solution blanked."""
+    full = dlx_solver.solve('.' * size ** 4, diagonal, size)
+    boxes = topology.get_topology(diagonal, size).boxes
+    return ''.join('.' if i % 3 == 0 else full[box] for i, box in enumerate(boxes))
 
 
 class TestNakedTwins(unittest.TestCase):
@@ -94,5 +133,633 @@ class TestDiagonalSudoku(unittest.TestCase):
     def test_solve(self):
         self.assertEqual(solution.solve(self.diagonal_grid), self.solved_diag_sudoku)
 
+    def test_solve_bitmask(self):
+        self.assertEqual(solution.solve(self.diagonal_grid, backend='bitmask'), self.solved_diag_sudoku)
+
+    def test_solve_dlx(self):
+        self.assertEqual(solution.solve(self.diagonal_grid, backend='dlx'), self.solved_diag_sudoku)
+
+
+class TestTopology(unittest.TestCase):
+
+    def test_cached_per_variant(self):
+        self.assertIs(topology.get_topology(True), topology.get_topology(True))
+        self.assertEqual(len(topology.get_topology(True).unit_list), 29)
+        self.assertEqual(len(topology.get_topology(False).unit_list), 27)
+
+    def test_repeated_solves(self):
+        for i in range(3):
+            solution.solve(TestDiagonalSudoku.diagonal_grid)
+            solution.initialize()
+        self.assertEqual(len(solution.unit_list), 29)
+        self.assertEqual(len(solution.diag_unit), 2)
+
+    def test_named_view(self):
+        for diagonal in (True, False):
+            board = topology.get_topology(diagonal, 4)
+            for i, box in enumerate(board.boxes):
+                self.assertEqual(board.box_index[box], i)
+                self.assertEqual(board.peers[box], frozenset(board.boxes[j] for j in board.index_peers[i]))
+                self.assertEqual(board.units[box], tuple(board.unit_list[u] for u in board.box_units[i]))
+            self.assertEqual(board.unit_list, tuple(tuple(board.boxes[i] for i in unit) for unit in board.index_units))
+        self.assertEqual(topology.get_topology().index_units[-1], (72, 64, 56, 48, 40, 32, 24, 16, 8))
+
+    def test_immutable(self):
+        diagonal = topology.get_topology()
+        with self.assertRaises(TypeError):
+            diagonal.peers['A1'] = frozenset()
+        with self.assertRaises(AttributeError):
+            diagonal.unit_list = ()
+
+    def test_standard_variant(self):
+        grid = '4.....8.5.3..........7......2.....6.....8.4......1.......6.3.7.5..2.....1.4......'
+        values = solution.solve(grid, diagonal=False)
+        self.assertEqual(values, dlx_solver.solve(grid, diagonal=False))
+
+    def test_threads(self):
+        from concurrent.futures import ThreadPoolExecutor
+        with ThreadPoolExecutor(4) as executor:
+            results = list(executor.map(solution.solve, [TestDiagonalSudoku.diagonal_grid] * 8))
+        self.assertTrue(all(values == TestDiagonalSudoku.solved_diag_sudoku for values in results))
+
+
+class TestRecording(unittest.TestCase):
+    grid = '.8..794...........3..5..9........1..........2..........72......8.1.....7...4.7.1.'
+
+    def tearDown(self):
+        solution.stop_recording()
+
+    def test_off_by_default(self):
+        self.assertIsNone(solution.recorder)
+
+    def test_frames(self):
+        log = solution.record_assignments()
+        values = solution.solve(self.grid)
+        frames = list(log.frames(solved_only=False))
+        self.assertEqual(len(frames), len(log) + 1)
+        self.assertEqual(frames[-1], values)
+        for box, old, new in log:
+            self.assertNotEqual(old, new)
+
+    def test_ring_buffer(self):
+        log = solution.record_assignments(maxlen=50)
+        values = solution.solve(self.grid)
+        self.assertEqual(len(log), 50)
+        *rest, last = log.frames()
+        self.assertEqual(last, values)
+
+    def test_new_recording_per_solve(self):
+        log = solution.record_assignments()
+        solution.solve(self.grid)
+        first = len(log)
+        solution.solve(self.grid)
+        self.assertEqual(len(log), first)
+
+
+def png_chunks(path):
+    """Return the (kind, data) chunks of a PNG file, checking their CRCs."""
+    with open(path, 'rb') as f:
+        data = f.read()
+    assert data[:8] == b'\x89PNG\r\n\x1a\n'
+    chunks, pos = [], 8
+    while pos < len(data):
+        length, kind = struct.unpack('>I4s', data[pos:pos + 8])
+        body = data[pos + 8:pos + 8 + length]
+        assert struct.unpack('>I', data[pos + 8 + length:pos + 12 + length])[0] == zlib.crc32(kind + body)
+        chunks.append((kind, body))
+        pos += 12 + length
+    return chunks
+
+
+class TestRender(unittest.TestCase):
+    grid = TestRecording.grid
+
+    def setUp(self):
+        self.log = solution.record_assignments()
+        self.values = solution.solve(self.grid)
+        solution.stop_recording()
+        self.directory = tempfile.mkdtemp()
+
+    def test_one_frame_per_shown_change(self):
+        # Every change that solves a box or takes a digit back is a frame, candidate removals are not
+        shown = dict((box, value if len(value) == 1 else '') for box, value in self.log.start().items())
+        expected = 1
+        for box, old, new in self.log:
+            digit = new if len(new) == 1 else ''
+            expected += shown[box] != digit
+            shown[box] = digit
+        path = os.path.join(self.directory, 'replay.png')
+        self.assertEqual(render.render_changelog(self.log, path), expected)
+        chunks = png_chunks(path)
+        kinds = [kind for kind, body in chunks]
+        self.assertEqual(kinds[:2], [b'IHDR', b'acTL'])
+        self.assertEqual(struct.unpack('>II', chunks[1][1]), (expected, 0))
+        self.assertEqual(kinds.count(b'fcTL'), expected)
+        self.assertEqual(kinds.count(b'fdAT'), expected - 1)
+
+    def test_dirty_rectangle(self):
+        renderer = render.Renderer(cell=20)
+        renderer.update(solution.grid_values(self.grid))
+        self.assertIsNone(renderer.update(solution.grid_values(self.grid)))
+        values = solution.grid_values(self.grid)
+        values['A1'] = self.values['A1']
+        x, y, width, height = renderer.update(values, ['A1'])
+        self.assertEqual((x, y, width, height), (render.THICK, render.THICK, 20, 20))
+        rows = renderer.region((x, y, width, height))
+        self.assertEqual(len(rows), 20)
+        self.assertTrue(any(bytes(render.PLACED) in row for row in rows))
+
+    def test_sequence(self):
+        count = render.render_changelog(self.log, self.directory, cell=12, sequence=True)
+        names = sorted(os.listdir(self.directory))
+        self.assertEqual(len(names), count)
+        chunks = png_chunks(os.path.join(self.directory, names[-1]))
+        width, height = struct.unpack('>II', chunks[0][1][:8])
+        self.assertEqual(width, height)
+        pixels = zlib.decompress(b''.join(body for kind, body in chunks if kind == b'IDAT'))
+        self.assertEqual(len(pixels), height * (1 + 3 * width))
+
+
+class TestLargeBoards(unittest.TestCase):
+
+    def test_topology(self):
+        board = topology.get_topology(False, 4)
+        self.assertEqual(len(board.boxes), 256)
+        self.assertEqual(board.boxes[-1], 'P16')
+        self.assertEqual(len(board.peers['A1']), 39)
+        self.assertEqual(board.digits, '123456789ABCDEFG')
+        with self.assertRaises(ValueError):
+            topology.get_topology(False, 6)
+
+    def test_16x16(self):
+        for diagonal in (False, True):
+            grid = large_puzzle(4, diagonal)
+            for backend, options in (('string', {}), ('bitmask', {}), ('dlx', {}),
+                                     ('bitmask', {'propagation': 'worklist', 'backtracking': 'trail'})):
+                values = solution.solve(grid, backend=backend, diagonal=diagonal, size=4, **options)
+                self.assertTrue(is_solution(values, grid, diagonal, 4))
+
+    def test_25x25(self):
+        grid = large_puzzle(5, False)
+        values = solution.solve(grid, backend='bitmask', diagonal=False, size=5, propagation='worklist', subsets=3)
+        self.assertTrue(is_solution(values, grid, False, 5))
+
+
+class TestBitmaskSolver(unittest.TestCase):
+
+    def test_naked_twins(self):
+        for before, possible in ((TestNakedTwins.before_naked_twins_1, TestNakedTwins.possible_solutions_1),
+                                 (TestNakedTwins.before_naked_twins_2, TestNakedTwins.possible_solutions_2)):
+            masks = bitmask_solver.naked_twins(bitmask_solver.values_masks(before), topology.get_topology())
+            self.assertTrue(bitmask_solver.masks_values(masks) in possible)
+
+    def test_unsolvable(self):
+        grid = '11' + '.' * 79
+        self.assertFalse(solution.solve(grid, backend='bitmask'))
+        self.assertFalse(solution.solve(grid, backend='bitmask', propagation='worklist'))
+
+    def test_worklist_propagation(self):
+        self.assertEqual(solution.solve(TestDiagonalSudoku.diagonal_grid, backend='bitmask', propagation='worklist'),
+                         TestDiagonalSudoku.solved_diag_sudoku)
+
+    def test_trail_backtracking(self):
+        grid = '.8..794...........3..5..9........1..........2..........72......8.1.....7...4.7.1.'
+        trail = bitmask_solver.Trail()
+        values = bitmask_solver.solve(grid, propagation='worklist', backtracking='trail', trail=trail)
+        # The grid has many solutions, so check this one rather than compare with another solver
+        self.assertTrue(is_solution(values, grid))
+        self.assertGreater(trail.undone, 0)
+
+    def test_trail_undo(self):
+        masks = bitmask_solver.grid_masks(TestDiagonalSudoku.diagonal_grid)
+        before = list(masks)
+        trail = bitmask_solver.Trail()
+        bitmask_solver.propagate(masks, topology.get_topology(), range(81), trail)
+        self.assertNotEqual(masks, before)
+        trail.undo(masks, 0)
+        self.assertEqual(masks, before)
+        self.assertEqual(len(trail), 0)
+
+    def test_worklist_matches_sweep(self):
+        grid = '.8..794...........3..5..9........1..........2..........72......8.1.....7...4.7.1.'
+        diagonal = topology.get_topology()
+        swept = bitmask_solver.reduce_puzzle(bitmask_solver.grid_masks(grid), diagonal)
+        queued = bitmask_solver.propagate(bitmask_solver.grid_masks(grid), diagonal, range(81))
+        for box in range(81):
+            self.assertEqual(queued[box] & swept[box], queued[box])
+
+    def test_unknown_backend(self):
+        with self.assertRaises(ValueError):
+            solution.solve(TestDiagonalSudoku.diagonal_grid, backend='nope')
+
+class TestStrategies(unittest.TestCase):
+    unit = tuple(range(9))
+
+    def masks(self, row):
+        return bitmask_solver.values_masks(dict(zip(topology.get_topology().boxes, row + ['123456789'] * 72)))
+
+    def test_naked_triple(self):
+        masks = self.masks(['12', '23', '13', '1234', '5', '6', '789', '789', '123789'])
+        changed = strategies.naked_subsets(masks, self.unit, 3)
+        self.assertEqual(sorted(set(changed)), [3, 8])
+        self.assertEqual(bitmask_solver.MASK_STRING[masks[3]], '4')
+        self.assertEqual(bitmask_solver.MASK_STRING[masks[8]], '789')
+
+    def test_hidden_pair(self):
+        masks = self.masks(['1234', '1234', '345', '345', '3456', '3456', '3789', '3789', '56789'])
+        changed = strategies.hidden_subsets(masks, self.unit, 2)
+        self.assertEqual(sorted(changed), [0, 1])
+        self.assertEqual(bitmask_solver.MASK_STRING[masks[0]], '12')
+
+    def test_contradiction(self):
+        masks = self.masks(['12', '12', '12', '3', '4', '5', '6', '7', '89'])
+        self.assertFalse(strategies.naked_subsets(masks, self.unit, 2))
+
+    def test_solve_with_subsets(self):
+        for propagation in ('sweep', 'worklist'):
+            self.assertEqual(solution.solve(TestDiagonalSudoku.diagonal_grid, backend='bitmask',
+                                            propagation=propagation, subsets=4),
+                             TestDiagonalSudoku.solved_diag_sudoku)
+
+
+class TestDlxSolver(unittest.TestCase):
+
+    def test_count(self):
+        self.assertEqual(dlx_solver.count(TestDiagonalSudoku.diagonal_grid), 1)
+        self.assertEqual(dlx_solver.count('.' * 81, limit=5, diagonal=False), 5)
+
+    def test_solve_all(self):
+        solutions = dlx_solver.solve_all('.' * 81, limit=3)
+        self.assertEqual(len(solutions), 3)
+        for values in solutions:
+            self.assertEqual(dlx_solver.count(''.join(values[box] for box in topology.get_topology().boxes)), 1)
+
+    def test_conflicting_clues(self):
+        self.assertFalse(dlx_solver.solve('11' + '.' * 79))
+        self.assertEqual(dlx_solver.count('1.........1' + '.' * 70), 0)
+
+
+class TestSolveMany(unittest.TestCase):
+    grids = [TestDiagonalSudoku.diagonal_grid, '11' + '.' * 79, 'too short', TestDiagonalSudoku.diagonal_grid]
+
+    def check(self, results):
+        self.assertEqual([result.index for result in results], [0, 1, 2, 3])
+        self.assertEqual(results[0].values, TestDiagonalSudoku.solved_diag_sudoku)
+        self.assertEqual(results[3].values, TestDiagonalSudoku.solved_diag_sudoku)
+        self.assertFalse(results[1].values)
+        self.assertIsNone(results[1].error)
+        self.assertIsNone(results[2].values)
+        self.assertTrue(results[2].error.startswith('AssertionError'))
+        self.assertTrue(all(result.seconds >= 0 for result in results))
+
+    def test_in_process(self):
+        self.check(batch.solve_many(self.grids, workers=1, backend='bitmask'))
+
+    def test_pool(self):
+        self.check(batch.solve_many(self.grids, workers=2, chunksize=1, backend='dlx'))
+
+    def test_unordered(self):
+        results = batch.solve_many(self.grids, workers=2, chunksize=1, ordered=False, backend='dlx')
+        self.check(sorted(results, key=lambda result: result.index))
+
+    def test_stream(self):
+        self.check(list(batch.solve_stream(iter(self.grids * 3), workers=2, chunksize=1, window=2,
+                                           backend='bitmask'))[:4])
+
+
+class TestCli(unittest.TestCase):
+    lines = [TestDiagonalSudoku.diagonal_grid + '\n', '\n', '11' + '.' * 79 + '\n', 'too short\n']
+
+    def test_run(self):
+        for workers in (1, 2):
+            output = io.StringIO()
+            report = cli.run(iter(self.lines), output, workers, chunksize=1, backend='bitmask')
+            solved = ''.join(TestDiagonalSudoku.solved_diag_sudoku[box] for box in topology.get_topology().boxes)
+            self.assertEqual(output.getvalue().splitlines()[:2], [solved, 'unsolvable'])
+            self.assertTrue(output.getvalue().splitlines()[2].startswith('error: AssertionError'))
+            self.assertIn('3 puzzles, 1 unsolvable, 1 errors', report)
+            self.assertIn('p99', report)
+
+    def test_percentile(self):
+        self.assertEqual(cli.percentile(list(range(1, 101)), 0.9), 90)
+        self.assertEqual(cli.percentile([5], 0.5), 5)
+
+
+class TestServer(unittest.TestCase):
+
+    async def exchange(self, clients, lines, **options):
+        service = server.SolverService(**options)
+        listener = await server.serve(service, port=0)
+        port = listener.sockets[0].getsockname()[1]
+        try:
+            answers = await asyncio.gather(*(server.query(lines, port=port) for _ in range(clients)))
+            stats = await server.query(['STATS'], port=port)
+        finally:
+            listener.close()
+            await listener.wait_closed()
+            await service.close()
+        return answers, json.loads(stats[0])
+
+    def test_answers_in_order(self):
+        answers, stats = asyncio.run(self.exchange(2, TestCli.lines * 4, max_batch=5, window=0.01))
+        solved = ''.join(TestDiagonalSudoku.solved_diag_sudoku[box] for box in topology.get_topology().boxes)
+        for lines in answers:
+            self.assertEqual(len(lines), 12)
+            self.assertEqual(lines[:2], [solved, 'unsolvable'])
+            self.assertTrue(lines[2].startswith('error: AssertionError'))
+        self.assertEqual(stats['requests'], 24)
+        self.assertEqual(stats['queue_depth'], 0)
+        self.assertEqual(stats['max_batch_size'], 5)
+        self.assertLess(stats['batches'], 24)
+        self.assertLessEqual(stats['latency_p50_ms'], stats['latency_max_ms'])
+
+    def test_worker_processes(self):
+        answers, stats = asyncio.run(self.exchange(1, TestCli.lines, workers=2, backend='dlx'))
+        self.assertEqual(answers[0][1], 'unsolvable')
+        self.assertEqual(stats['requests'], 3)
+
+
+class TestSolverStats(unittest.TestCase):
+    # Has a single solution under the standard rules and needs guessing, unlike
+    # TestDiagonalSudoku.diagonal_grid
+    grid = '4.....8.5.3..........7......2.....6.....8.4......1.......6.3.7.5..2.....1.4......'
+
+    def check(self, stats, strategies):
+        self.assertEqual(sorted(stats.strategies), sorted(strategies))
+        self.assertGreater(stats.branch_points, 0)
+        self.assertGreaterEqual(stats.max_depth, 1)
+        self.assertLessEqual(stats.backtracks, stats.branch_points * 9)
+        removed = sum(strategy.removed for strategy in stats.strategies.values())
+        self.assertGreater(removed, 0)
+        self.assertGreater(stats.seconds, 0)
+        self.assertEqual(stats.as_dict()['branch_points'], stats.branch_points)
+        self.assertIn('branch points', stats.report())
+
+    def test_string(self):
+        values, stats = solution.solve(self.grid, diagonal=False, stats=True)
+        self.assertTrue(is_solution(values, self.grid, diagonal=False))
+        self.check(stats, ['eliminate', 'naked_twins', 'only_choice'])
+
+    def test_bitmask(self):
+        values, stats = solution.solve(self.grid, backend='bitmask', diagonal=False, stats=True)
+        self.assertTrue(is_solution(values, self.grid, diagonal=False))
+        self.check(stats, ['eliminate', 'naked_twins', 'only_choice'])
+
+    def test_subsets(self):
+        # Naked and hidden pairs solve this grid without guessing
+        values, stats = solution.solve(self.grid, backend='bitmask', diagonal=False, subsets=2, stats=True)
+        self.assertTrue(is_solution(values, self.grid, diagonal=False))
+        self.assertIn('subsets', stats.strategies)
+        self.assertEqual(stats.branch_points, 0)
+
+    def test_trail(self):
+        values, stats = solution.solve(self.grid, backend='bitmask', propagation='worklist', backtracking='trail',
+                                       diagonal=False, stats=True)
+        self.assertTrue(is_solution(values, self.grid, diagonal=False))
+        self.check(stats, ['propagate'])
+        self.assertEqual(stats.undone > 0, stats.backtracks > 0)
+
+    def test_disabled(self):
+        self.assertTrue(is_solution(solution.solve(self.grid, backend='bitmask', diagonal=False), self.grid,
+                                    diagonal=False))
+        with self.assertRaises(ValueError):
+            solution.solve(self.grid, backend='dlx', stats=True)
+
+
+class TestBranching(unittest.TestCase):
+    grid = TestSolverStats.grid
+
+    def test_policies(self):
+        for select in ('mrv', 'degree'):
+            for order in ('index', 'lcv', 'frequency'):
+                for options in ({}, {'propagation': 'worklist', 'backtracking': 'trail'}):
+                    values, stats = solution.solve(self.grid, 'bitmask', diagonal=False, stats=True, select=select,
+                                                   order=order, **options)
+                    self.assertTrue(is_solution(values, self.grid, diagonal=False))
+                    self.assertGreater(stats.branch_points, 0)
+
+    def test_default_is_mrv(self):
+        default = solution.solve(self.grid, 'bitmask', diagonal=False, stats=True)[1]
+        mrv = solution.solve(self.grid, 'bitmask', diagonal=False, stats=True, select='mrv', order='index')[1]
+        self.assertEqual((default.branch_points, default.backtracks), (mrv.branch_points, mrv.backtracks))
+
+    def test_orders(self):
+        board = topology.get_topology(False)
+        masks = bitmask_solver.grid_masks(self.grid, board)
+        popcount = bitmask_solver.popcount_table(9)
+        for order in branching.ORDERINGS.values():
+            self.assertEqual(sorted(order(masks, 1, popcount, board)), [1 << d for d in range(9)])
+
+    def test_unknown(self):
+        with self.assertRaises(ValueError):
+            solution.solve(self.grid, 'bitmask', select='random')
+        with self.assertRaises(ValueError):
+            solution.solve(self.grid, order='lcv')
+
+
+class TestParallelSearch(unittest.TestCase):
+    grid = TestSolverStats.grid
+
+    def test_solve(self):
+        for budget in (1, 2000):
+            values = parallel_search.solve_parallel(self.grid, diagonal=False, workers=2, budget=budget)
+            self.assertTrue(is_solution(values, self.grid, diagonal=False))
+        values = solution.solve(self.grid, 'bitmask', 'worklist', diagonal=False, workers=2, select='degree')
+        self.assertTrue(is_solution(values, self.grid, diagonal=False))
+
+    def test_no_solution(self):
+        self.assertFalse(parallel_search.solve_parallel('11' + '.' * 79, workers=2))
+        self.assertFalse(parallel_search.solve_parallel(self.grid, workers=2, budget=5))
+
+    def test_explore_split(self):
+        subproblems, solved = parallel_search.frontier(self.grid, topology.get_topology(False), 4)
+        self.assertIsNone(solved)
+        self.assertGreaterEqual(len(subproblems), 4)
+        root = (bitmask_solver.grid_masks(self.grid, topology.get_topology(False)), None)
+        kind, rest = parallel_search.explore((root, False, 3, None, 'mrv', 'index', 1))
+        self.assertEqual(kind, parallel_search.SPLIT)
+        self.assertGreater(len(rest), 1)
+
+
+class TestDigitPlaces(unittest.TestCase):
+    grid = TestSolverStats.grid
+
+    def board(self):
+        board = topology.get_topology(False)
+        return board, solution.eliminate(solution.grid_values(self.grid, board), board)
+
+    def test_counts_follow_assignments(self):
+        board, values = self.board()
+        places = digit_places.DigitPlaces(values, board)
+        other = places.copy()
+        box = next(box for box in board.boxes if len(values[box]) > 1)
+        solution.assign_value(places, box, values[box][0])
+        for u, unit in enumerate(board.unit_list):
+            for digit in board.digits:
+                self.assertEqual(places.counts[u][digit], sum(1 for b in unit if digit in places[b]))
+                self.assertEqual(other.counts[u][digit], sum(1 for b in unit if digit in values[b]))
+
+    def test_only_choice(self):
+        board, values = self.board()
+        expected = solution.only_choice(dict(values), board)
+        places = solution.only_choice(digit_places.DigitPlaces(values, board), board)
+        self.assertIsNone(places.pop_single())
+        # Hidden singles found later in the same pass are placed too
+        self.assertTrue(all(len(places[box]) <= len(expected[box]) for box in board.boxes))
+        self.assertEqual(solution.reduce_puzzle(places, board), solution.reduce_puzzle(expected, board))
+
+
+class TestCountSolutions(unittest.TestCase):
+    # A hard puzzle with a single solution under the standard rules
+    unique = '4.....8.5.3..........7......2.....6.....8.4......1.......6.3.7.5..2.....1.4......'
+    # Blanking one clue of the diagonal puzzle leaves 8 solutions
+    several = TestDiagonalSudoku.diagonal_grid[:25] + '.' + TestDiagonalSudoku.diagonal_grid[26:]
+
+    def test_count(self):
+        for options in ({}, {'subsets': 3}, {'backend': 'dlx'}):
+            self.assertEqual(solution.count_solutions(self.unique, diagonal=False, **options), 1)
+            self.assertEqual(solution.count_solutions(self.several, **options), 2)
+            self.assertEqual(solution.count_solutions(self.several, limit=None, **options), 8)
+            self.assertEqual(solution.count_solutions('11' + '.' * 79, **options), 0)
+
+    def test_is_unique(self):
+        self.assertTrue(solution.is_unique(self.unique, diagonal=False))
+        self.assertFalse(solution.is_unique(self.unique))
+        self.assertFalse(solution.is_unique(self.several))
+        self.assertFalse(solution.is_unique('.' * 16, diagonal=False, size=2))
+
+    def test_parallel(self):
+        self.assertEqual(solution.count_solutions(self.several, limit=None, workers=2), 8)
+        self.assertEqual(solution.count_solutions(self.several, workers=2), 2)
+        self.assertTrue(solution.is_unique(self.unique, diagonal=False, workers=2))
+
+
+def transpose(grid, n=9):
+    return ''.join(grid[c * n + r] for r in range(n) for c in range(n))
+
+
+def relabel(grid, digits='987654321'):
+    return ''.join(digits[int(value) - 1] if value != '.' else value for value in grid)
+
+
+class TestSolutionCache(unittest.TestCase):
+    grid = TestSolverStats.grid
+    diagonal_grid = TestDiagonalSudoku.diagonal_grid
+
+    def test_isomorphic_hit(self):
+        cache = canonical.SolutionCache()
+        self.assertTrue(is_solution(solution.solve(self.grid, 'bitmask', diagonal=False, cache=cache), self.grid,
+                                    diagonal=False))
+        # Swap the first two bands and the columns of the first stack, then relabel and transpose
+        rows = [self.grid[r * 9:r * 9 + 9] for r in range(9)]
+        rows = [row[2::-1] + row[3:] for row in rows[3:6] + rows[:3] + rows[6:]]
+        other = relabel(transpose(''.join(rows)))
+        values = solution.solve(other, 'bitmask', diagonal=False, cache=cache)
+        self.assertTrue(is_solution(values, other, diagonal=False))
+        self.assertEqual((cache.hits, cache.misses), (1, 1))
+
+    def test_diagonal_symmetries(self):
+        cache = canonical.SolutionCache()
+        solution.solve(self.diagonal_grid, cache=cache)
+        other = relabel(transpose(self.diagonal_grid))
+        self.assertEqual(solution.solve(other, cache=cache), solution.solve(other))
+        self.assertEqual(cache.hits, 1)
+        # Swapping two rows of a band moves boxes off the diagonals, so it is a different puzzle
+        swapped = self.diagonal_grid[9:18] + self.diagonal_grid[:9] + self.diagonal_grid[18:]
+        self.assertNotEqual(canonical.canonical_form(swapped)[0], canonical.canonical_form(self.diagonal_grid)[0])
+
+    def test_bounded_and_unsolvable(self):
+        cache = canonical.SolutionCache(maxsize=1)
+        self.assertFalse(solution.solve(self.diagonal_grid[:-1] + '2', 'bitmask', cache=cache))
+        self.assertFalse(solution.solve(relabel(self.diagonal_grid[:-1] + '2'), 'bitmask', cache=cache))
+        solution.solve(self.diagonal_grid, 'bitmask', cache=cache)
+        self.assertEqual((len(cache), cache.hits, cache.misses), (1, 1, 2))
+
+    def test_disk(self):
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'solutions')
+            cache = canonical.SolutionCache(path=path)
+            solution.solve(self.grid, 'bitmask', diagonal=False, cache=cache)
+            cache.close()
+            cache = canonical.SolutionCache(path=path)
+            values = solution.solve(relabel(self.grid), 'bitmask', diagonal=False, cache=cache)
+            cache.close()
+            self.assertTrue(is_solution(values, relabel(self.grid), diagonal=False))
+            self.assertEqual(cache.hits, 1)
+
+
+class TestBenchmark(unittest.TestCase):
+
+    def test_corpus(self):
+        grids, diagonal = benchmark.corpus('hard', 2, seed=1)
+        self.assertFalse(diagonal)
+        self.assertEqual(grids, benchmark.corpus('hard', 2, seed=1)[0])
+        for grid in grids:
+            self.assertTrue(solution.is_unique(grid, diagonal=False))
+            self.assertTrue(benchmark.needs_search(grid, False))
+
+    def test_run(self):
+        report = benchmark.run(['easy'], count=2, repeat=1, configurations=benchmark.CONFIGURATIONS[:2])
+        names = [result['configuration'] for result in report['results']]
+        self.assertEqual(names[:2], ['string', 'bitmask-sweep'])
+        self.assertTrue(all(result['solved'] == 2 for result in report['results']))
+        self.assertIn('backtracks', report['results'][1])
+        self.assertEqual(report['meta']['seed'], 1)
+
+
+class TestGenerator(unittest.TestCase):
+
+    def test_tiers(self):
+        for tier, diagonal in (('easy', False), ('medium', False), ('hard', True)):
+            fewest, most = generator.BRANCH_POINTS[diagonal][tier]
+            puzzles = list(generator.generate(2, tier, diagonal=diagonal, workers=1))
+            for puzzle in puzzles:
+                self.assertEqual(bitmask_solver.count_solutions(puzzle.grid, 2, diagonal), 1)
+                self.assertEqual(generator.branch_points(puzzle.grid, diagonal), puzzle.branch_points)
+                self.assertGreaterEqual(puzzle.branch_points, fewest)
+                self.assertLessEqual(puzzle.branch_points, most)
+            self.assertEqual(puzzles, list(generator.generate(2, tier, diagonal=diagonal, workers=2)))
+
+    def test_run(self):
+        output = io.StringIO()
+        report = generator.run(output, 2, 'medium', diagonal=False, workers=1)
+        self.assertEqual(len(output.getvalue().splitlines()), 2)
+        self.assertIn('2 medium puzzles, 0 given up', report)
+        self.assertIn('puzzles/s', report)
+        with self.assertRaises(ValueError):
+            next(generator.generate(1, 'impossible'))
+
+
+@unittest.skipIf(vector_solver.np is None, 'NumPy is not installed')
+class TestVectorSolver(unittest.TestCase):
+    hard_grid = TestSolverStats.grid
+
+    def test_solve_batch(self):
+        grids = [TestDiagonalSudoku.diagonal_grid, '11' + '.' * 79]
+        self.assertEqual(vector_solver.solve_batch(grids), [TestDiagonalSudoku.solved_diag_sudoku, False])
+        solved = vector_solver.solve_batch([self.hard_grid, self.hard_grid], diagonal=False)
+        self.assertTrue(all(is_solution(values, self.hard_grid, diagonal=False) for values in solved))
+
+    def test_propagation_alone(self):
+        candidates = vector_solver.load([TestDiagonalSudoku.diagonal_grid, '11' + '.' * 79])
+        status = vector_solver.propagate(candidates)
+        self.assertEqual(list(status), [vector_solver.SOLVED, vector_solver.INVALID])
+        masks = vector_solver.candidate_masks(candidates)[0]
+        self.assertEqual(bitmask_solver.masks_values(masks), TestDiagonalSudoku.solved_diag_sudoku)
+        board = topology.get_topology(False)
+        candidates = vector_solver.load([self.hard_grid], board)
+        self.assertEqual(list(vector_solver.propagate(candidates, board)), [vector_solver.OPEN])
+
+    def test_large_board(self):
+        grid = large_puzzle(4, True)
+        self.assertTrue(is_solution(vector_solver.solve_batch([grid], size=4)[0], grid, True, 4))
+
+    def test_bad_grids(self):
+        with self.assertRaises(ValueError):
+            vector_solver.solve_batch(['123'])
+        with self.assertRaises(ValueError):
+            vector_solver.solve_batch([TestDiagonalSudoku.diagonal_grid.replace('.', '0')])
+
+
 if __name__ == '__main__':
     unittest.main()
@@ -0,0 +1,104 @@
+"""
+Precomputed, immutable board topology (boxes, units and peers) for each Sudoku variant.
+
+Topologies are built once per variant by get_topology() and shared afterwards, so the solver
+functions can take one as an argument instead of reading module level globals. Nothing in a
+Topology can be modified, which makes it safe to share between threads.
+
+The tables are built on box indices first, box i being row i // n and column i % n of an n x n
+board: index_units, index_peers and box_units hold tuples of ints, and the bitmask, dancing links
+and vector solvers only use those. The named tables (boxes, unit_list, units, peers) are a view
+of the same units for the string solver and for callers that work on values dictionaries.
+
+A variant is the box size (3 for the usual 9x9 board, 4 for 16x16, 5 for 25x25) and whether
+the two main diagonals are units. Rows are labelled with letters and columns with numbers, so
+the boxes of a 16x16 board run from 'A1' to 'P16'. Digits past 9 are written as letters:
+a 16x16 board uses '123456789ABCDEFG'.
+"""
+
+from collections import namedtuple
+from functools import lru_cache
+from types import MappingProxyType
+
+ROW_LABELS = 'ABCDEFGHIJKLMNOPQRSTUVWXY'
+DIGITS = '123456789ABCDEFGHIJKLMNOP'
+MAX_SIZE = 5
+
+
+def cross(A, B):
+    "Cross product of elements in A and elements in B."
+    return [s + t for s in A for t in B]
+
+
+class Topology(namedtuple('Topology', ['size', 'n', 'rows', 'cols', 'digits', 'diagonal', 'boxes', 'row_units',
+                                       'col_units', 'square_units', 'diag_units', 'unit_list', 'units', 'peers',
+                                       'index_units', 'index_peers', 'box_units', 'box_index'])):
+    """
+    Boxes, units and peers of one Sudoku variant. Use get_topology() rather than building one.
+        size: the side of a square, 3 for a 9x9 board
+        n: the side of the board and number of digits, size * size
+        rows, cols, digits: the row labels, column labels and digits, e.g. 'ABCDEFGHI'
+        diagonal: whether the two main diagonals are units
+        boxes: tuple of box names in reading order
+        row_units, col_units, square_units, diag_units: tuples of units, a unit being a tuple of box names
+        unit_list: every unit of the variant
+        units: read-only mapping of box name to the units that contain it
+        peers: read-only mapping of box name to the frozenset of its peers
+        index_units: unit_list with every box replaced by its index in boxes
+        index_peers: index_peers[i] is the sorted tuple of the indices of the peers of box i
+        box_units: box_units[i] is the tuple of the positions in unit_list of the units of box i
+        box_index: read-only mapping of box name to its index in boxes
+    """
+    __slots__ = ()
+
+
+@lru_cache(maxsize=None)
+def get_topology(diagonal=True, size=3):
+    """
+    Return the topology of a variant, building it on first use.
+    Args:
+        diagonal(bool): True for diagonal Sudoku, False for the standard rules
+        size(int): the side of a square, 3 to 5 (9x9, 16x16 or 25x25 boards)
+    Returns:
+        The shared Topology of that variant.
+    """
+    if not 2 <= size <= MAX_SIZE:
+        raise ValueError("Unsupported box size: {}".format(size))
+    n = size * size
+    rows = ROW_LABELS[:n]
+    cols = ''.join(str(c) for c in range(1, n + 1)) if n <= 9 else tuple(str(c) for c in range(1, n + 1))
+
+    # Integer form, box i being in row i // n and column i % n
+    row_index = tuple(tuple(r * n + c for c in range(n)) for r in range(n))
+    col_index = tuple(tuple(r * n + c for r in range(n)) for c in range(n))
+    square_index = tuple(tuple((band + r) * n + stack + c for r in range(size) for c in range(size))
+                         for band in range(0, n, size) for stack in range(0, n, size))
+    if diagonal:
+        diag_index = (tuple(i * n + i for i in range(n)), tuple((n - 1 - i) * n + i for i in range(n)))
+    else:
+        diag_index = ()
+    index_units = row_index + col_index + square_index + diag_index
+    containing = [[] for _ in range(n * n)]
+    for u, unit in enumerate(index_units):
+        for i in unit:
+            containing[i].append(u)
+    box_units = tuple(tuple(positions) for positions in containing)
+    index_peers = tuple(tuple(sorted(set(j for u in box_units[i] for j in index_units[u]) - {i}))
+                        for i in range(n * n))
+
+    # Named view of the same tables
+    boxes = tuple(cross(rows, cols))
+
+    def named(units):
+        return tuple(tuple(boxes[i] for i in unit) for unit in units)
+
+    row_units, col_units, square_units, diag_units = (named(row_index), named(col_index), named(square_index),
+                                                      named(diag_index))
+    unit_list = row_units + col_units + square_units + diag_units
+    units = dict((s, tuple(unit_list[u] for u in box_units[i])) for i, s in enumerate(boxes))
+    peers = dict((s, frozenset(boxes[j] for j in index_peers[i])) for i, s in enumerate(boxes))
+    box_index = dict((s, i) for i, s in enumerate(boxes))
+
+    return Topology(size, n, rows, cols, DIGITS[:n], diagonal, boxes, row_units, col_units, square_units,
+                    diag_units, unit_list, MappingProxyType(units), MappingProxyType(peers),
+                    index_units, index_peers, box_units, MappingProxyType(box_index))
@@ -0,0 +1,162 @@
+"""
+Vectorized constraint propagation over many boards at once, using NumPy.
+
+    from vector_solver import solve_batch
+    solutions = solve_batch(grids, diagonal=False)
+
+The grids are loaded into one N x boxes x digits boolean tensor of candidates. Elimination and
+hidden singles then run as a few matrix products per pass over the whole batch, instead of
+Python loops over every box of every board. Most puzzles are solved by propagation alone; only
+the boards left open are handed to bitmask_solver.search(), starting from the propagated
+candidates.
+
+NumPy is optional: the rest of the project does not need it, and solve_batch() raises
+ImportError when it is missing.
+"""
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+import bitmask_solver
+from topology import get_topology
+
+OPEN, SOLVED, INVALID = 0, 1, 2
+
+
+def _require_numpy():
+    if np is None:
+        raise ImportError("vector_solver needs NumPy, install it with 'pip install numpy'")
+
+
+def _matrices(topology):
+    """
+    Return the (peers, units) matrices of a topology as float32 arrays, for matmul.
+        peers[i, j] is 1 if box j is a peer of box i
+        units[u, i] is 1 if box i is in unit u
+    """
+    cells = len(topology.boxes)
+    peers = np.zeros((cells, cells), dtype=np.float32)
+    for box, box_peers in enumerate(topology.index_peers):
+        peers[box, list(box_peers)] = 1
+    units = np.zeros((len(topology.index_units), cells), dtype=np.float32)
+    for u, unit in enumerate(topology.index_units):
+        units[u, list(unit)] = 1
+    return peers, units
+
+
+def load(grids, topology=None):
+    """
+    Load grid strings into a candidates tensor.
+    Args:
+        grids(list): grid strings, '.' for empty boxes and digits of the topology elsewhere
+        topology(Topology): the board topology, the diagonal 9x9 one if None
+    Returns:
+        A boolean array of shape (len(grids), n*n, n), candidates[b, i, d] being True if digit
+        d + 1 is still possible in box i of board b.
+    """
+    _require_numpy()
+    if topology is None:
+        topology = get_topology()
+    n = topology.n
+    cells = n * n
+    for grid in grids:
+        if len(grid) != cells:
+            raise ValueError("Expected a grid of {} boxes, got {}".format(cells, len(grid)))
+    # Byte value -> digit index, -1 for an empty box
+    lookup = np.full(256, -1, dtype=np.int64)
+    for i, digit in enumerate(topology.digits):
+        lookup[ord(digit)] = i
+    raw = np.frombuffer(''.join(grids).encode('ascii'), dtype=np.uint8).reshape(len(grids), cells)
+    given = lookup[raw]
+    unknown = (given < 0) & (raw != ord('.'))
+    if unknown.any():
+        raise ValueError("Unknown box value: {!r}".format(chr(raw[unknown][0])))
+    candidates = np.ones((len(grids), cells, n), dtype=bool)
+    filled = given >= 0
+    candidates[filled] = False
+    candidates[filled, given[filled]] = True
+    return candidates
+
+
+def propagate(candidates, topology=None):
+    """
+    Apply elimination and hidden singles to every board until none of them changes any more.
+    Args:
+        candidates(array): the tensor from load(), changed in place
+        topology(Topology): the board topology, the diagonal 9x9 one if None
+    Returns:
+        An array with the status of every board: OPEN, SOLVED or INVALID.
+    """
+    _require_numpy()
+    if topology is None:
+        topology = get_topology()
+    peers, units = _matrices(topology)
+    status = np.full(len(candidates), OPEN, dtype=np.int8)
+    active = np.arange(len(candidates))
+    while len(active):
+        board = candidates[active]
+        before = board.copy()
+        # Elimination: drop the digit of every solved box from its peers
+        solved = board & (board.sum(axis=2) == 1)[:, :, None]
+        board &= np.matmul(peers, solved.astype(np.float32)) == 0
+        # Hidden singles: a digit with a single place in a unit goes there
+        places = np.matmul(units, board.astype(np.float32))
+        singles = np.matmul(units.T, (places == 1).astype(np.float32)) > 0
+        singles &= board
+        hidden = singles.any(axis=2)
+        board[hidden] = singles[hidden]
+
+        counts = board.sum(axis=2)
+        invalid = ((counts == 0).any(axis=1) | (places == 0).any(axis=(1, 2)) |
+                   (singles.sum(axis=2) > 1).any(axis=1))
+        done = (counts == 1).all(axis=1)
+        changed = (board != before).any(axis=(1, 2))
+        candidates[active] = board
+        status[active[invalid]] = INVALID
+        status[active[done & ~invalid]] = SOLVED
+        active = active[changed & ~invalid]
+    return status
+
+
+def candidate_masks(candidates, topology=None):
+    """Convert a candidates tensor into one list of bitmask_solver masks per board."""
+    _require_numpy()
+    if topology is None:
+        topology = get_topology()
+    weights = 1 << np.arange(topology.n, dtype=np.int64)
+    return (candidates.astype(np.int64) * weights).sum(axis=2).tolist()
+
+
+def solve_batch(grids, diagonal=True, size=3, propagation='worklist', subsets=None):
+    """
+    Solve many grids, propagating all of them at once and searching only the ones left open.
+    Args:
+        grids(list): grid strings, '.' for empty boxes
+        diagonal(bool): whether the two main diagonals must hold every digit too
+        size(int): the side of a square, 3 for 9x9 boards, 4 for 16x16 and 5 for 25x25
+        propagation(string): the bitmask_solver.search() propagation of the boards left open
+        subsets(int): the bitmask_solver.search() subsets of the boards left open
+    Returns:
+        A list with the solution of every grid in dictionary form, False for those without one.
+    """
+    _require_numpy()
+    topology = get_topology(diagonal, size)
+    grids = list(grids)
+    if not grids:
+        return []
+    candidates = load(grids, topology)
+    status = propagate(candidates, topology)
+    results = []
+    for board, masks in zip(status, candidate_masks(candidates, topology)):
+        if board == INVALID:
+            results.append(False)
+            continue
+        if board == OPEN:
+            masks = bitmask_solver.search(masks, topology, propagation, subsets=subsets)
+            if masks is False:
+                results.append(False)
+                continue
+        results.append(bitmask_solver.masks_values(masks, topology))
+    return results
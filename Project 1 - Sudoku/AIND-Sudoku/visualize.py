@@ -1,7 +1,16 @@
 from PySudoku import play
+from recording import ChangeLog
 
 def visualize_assignments(assignments):
-    """ Visualizes the set of assignments created by the Sudoku AI"""
+    """ Visualizes the set of assignments created by the Sudoku AI
+    Args:
+        assignments: a ChangeLog from solution.record_assignments(), or a list of full boards
+    """
+    if isinstance(assignments, ChangeLog):
+        # Frames are only rebuilt here, for the changes that solve a box
+        play(assignments.frames(solved_only=True))
+        return
+
     last_assignment = None
     filtered_assignments = []
 
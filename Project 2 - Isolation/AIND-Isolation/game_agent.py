@@ -292,7 +292,11 @@ class MinimaxPlayer(IsolationPlayer):
             return self.score(gameState, self)
         v = float("inf")
         for m in gameState.get_legal_moves():
-            v = min(v, self.max_value(gameState.forecast_move(m), depth-1))
+            gameState.push_move(m)
+            try:
+                v = min(v, self.max_value(gameState, depth-1))
+            finally:
+                gameState.pop_move()
         
         return v
 
@@ -308,7 +312,11 @@ class MinimaxPlayer(IsolationPlayer):
             return self.score(gameState, self)
         v = float("-inf")
         for m in gameState.get_legal_moves():
-            v = max(v, self.min_value(gameState.forecast_move(m), depth-1))
+            gameState.push_move(m)
+            try:
+                v = max(v, self.min_value(gameState, depth-1))
+            finally:
+                gameState.pop_move()
 
         return v
     
@@ -332,7 +340,11 @@ class MinimaxPlayer(IsolationPlayer):
         best_score = float("-inf")
         best_move = legal_moves[0]
         for m in legal_moves:
-            v = self.min_value(gameState.forecast_move(m), depth-1)
+            gameState.push_move(m)
+            try:
+                v = self.min_value(gameState, depth-1)
+            finally:
+                gameState.pop_move()
             if v > best_score:
                 best_score = v
                 best_move = m
@@ -425,7 +437,11 @@ class AlphaBetaPlayer(IsolationPlayer):
             return self.score(gameState, self)
         v = float("inf")
         for m in gameState.get_legal_moves():
-            v = min(v, self.max_value(gameState.forecast_move(m), depth-1, alpha, beta))
+            gameState.push_move(m)
+            try:
+                v = min(v, self.max_value(gameState, depth-1, alpha, beta))
+            finally:
+                gameState.pop_move()
 
             if v <= alpha:
                 return v
@@ -445,7 +461,11 @@ class AlphaBetaPlayer(IsolationPlayer):
             return self.score(gameState, self)
         v = float("-inf")
         for m in gameState.get_legal_moves():
-            v = max(v, self.min_value(gameState.forecast_move(m), depth-1, alpha, beta))
+            gameState.push_move(m)
+            try:
+                v = max(v, self.min_value(gameState, depth-1, alpha, beta))
+            finally:
+                gameState.pop_move()
 
             if v >= beta:
                 return v
@@ -511,7 +531,11 @@ class AlphaBetaPlayer(IsolationPlayer):
         best_score = float("-inf")
         best_move = legal_moves[0]
         for m in legal_moves:
-            v = self.min_value(game.forecast_move(m), depth-1, alpha, beta)
+            game.push_move(m)
+            try:
+                v = self.min_value(game, depth-1, alpha, beta)
+            finally:
+                game.pop_move()
             alpha = max(v, alpha)
             if v > best_score:
                 best_score = v
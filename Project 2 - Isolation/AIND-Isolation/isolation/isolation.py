@@ -13,6 +13,25 @@ from copy import copy
 
 TIME_LIMIT_MILLIS = 150
 
+# (width, height) -> Zobrist keys, see _zobrist_keys()
+_ZOBRIST_KEYS = {}
+
+
+def _zobrist_keys(width, height):
+    """Return the Zobrist keys of a board size, building them on first use:
+    (key of every blocked cell, (key of every player 1 location, key of every
+    player 2 location), key of player 2 holding the initiative). The keys come
+    from a fixed seed, so equal positions hash alike on every board of a size.
+    """
+    key = (width, height)
+    if key not in _ZOBRIST_KEYS:
+        rnd = random.Random("zobrist-{}x{}".format(width, height))
+        cells = width * height
+        blocked = tuple(rnd.getrandbits(64) for _ in range(cells))
+        locations = tuple(tuple(rnd.getrandbits(64) for _ in range(cells)) for _ in range(2))
+        _ZOBRIST_KEYS[key] = (blocked, locations, rnd.getrandbits(64))
+    return _ZOBRIST_KEYS[key]
+
 
 class Board(object):
     """Implement a model for the game Isolation assuming each player moves like
@@ -52,8 +71,19 @@ class Board(object):
         self._board_state[-1] = Board.NOT_MOVED
         self._board_state[-2] = Board.NOT_MOVED
 
+        # (cell, previous location, previous cell value, previous hash) of
+        # every pushed move
+        self._undo = []
+
+        # Zobrist hash of the state, updated by apply_move()
+        self._zobrist = _zobrist_keys(width, height)
+        self._hash = 0
+
     def hash(self):
-        return str(self._board_state).__hash__()
+        """Return the Zobrist hash of the blocked cells, the player locations
+        and the initiative, kept up to date by every move.
+        """
+        return self._hash
 
     @property
     def active_player(self):
@@ -97,6 +127,8 @@ class Board(object):
         new_board._active_player = self._active_player
         new_board._inactive_player = self._inactive_player
         new_board._board_state = copy(self._board_state)
+        new_board._undo = list(self._undo)
+        new_board._hash = self._hash
         return new_board
 
     def forecast_move(self, move):
@@ -200,13 +232,59 @@ class Board(object):
             the active player on the board.
         """
         idx = move[0] + move[1] * self.height
-        last_move_idx = int(self.active_player == self._player_2) + 1
+        player = int(self.active_player == self._player_2)
+        last_move_idx = player + 1
+        blocked_keys, location_keys, initiative_key = self._zobrist
+        last_move = self._board_state[-last_move_idx]
+        self._hash ^= initiative_key ^ location_keys[player][idx]
+        if last_move != Board.NOT_MOVED:
+            self._hash ^= location_keys[player][last_move]
+        if not self._board_state[idx]:
+            self._hash ^= blocked_keys[idx]
         self._board_state[-last_move_idx] = idx
         self._board_state[idx] = 1
         self._board_state[-3] ^= 1
         self._active_player, self._inactive_player = self._inactive_player, self._active_player
         self.move_count += 1
 
+    def push_move(self, move):
+        """Apply a move in place, like apply_move(), so that pop_move() can
+        take it back. A search can then explore children on one board instead
+        of a copy per node from forecast_move():
+
+            game.push_move(move)
+            try:
+                score = search(game)
+            finally:
+                game.pop_move()
+
+        Parameters
+        ----------
+        move : (int, int)
+            A coordinate pair (row, column) indicating the next position for
+            the active player on the board.
+        """
+        idx = move[0] + move[1] * self.height
+        last_move_idx = int(self.active_player == self._player_2) + 1
+        self._undo.append((idx, self._board_state[-last_move_idx], self._board_state[idx], self._hash))
+        self.apply_move(move)
+
+    def pop_move(self):
+        """Take back the last move applied by push_move(), restoring the exact
+        state before it: the blocked cell, the player location, the initiative,
+        move_count, the active and inactive players and the hash. Moves made with
+        apply_move() are not recorded and cannot be taken back.
+        """
+        if not self._undo:
+            raise RuntimeError("pop_move() called without a matching push_move()")
+        idx, last_move, cell, self._hash = self._undo.pop()
+        self._active_player, self._inactive_player = self._inactive_player, self._active_player
+        last_move_idx = int(self.active_player == self._player_2) + 1
+        self._board_state[-last_move_idx] = last_move
+        self._board_state[idx] = cell
+        self._board_state[-3] ^= 1
+        self.move_count -= 1
+
     def is_winner(self, player):
         """ Test whether the specified player has won the game. """
         return player == self._inactive_player and not self.get_legal_moves(self._active_player)
@@ -340,3 +418,308 @@ class Board(object):
             move_history.append(list(curr_move))
 
             self.apply_move(curr_move)
+
+
+# (width, height) -> (knight move mask of every cell, (row, column) of every
+# cell, {move mask: tuple of the coordinates of its cells})
+_KNIGHT_TABLES = {}
+
+
+def _knight_tables(width, height):
+    """Return the knight move masks and cell coordinates of a board size,
+    building them on first use. Cells are numbered like Board cells, so cell
+    `row + column * height` is bit `row + column * height` of a mask. The
+    last table is filled in as moves are generated: a cell has at most 8
+    knight moves, so there are at most 256 move masks per cell.
+    """
+    key = (width, height)
+    if key not in _KNIGHT_TABLES:
+        directions = [(-2, -1), (-2, 1), (-1, -2), (-1, 2),
+                      (1, -2), (1, 2), (2, -1), (2, 1)]
+        coordinates = tuple((idx % height, idx // height) for idx in range(width * height))
+        masks = []
+        for r, c in coordinates:
+            mask = 0
+            for dr, dc in directions:
+                if 0 <= r + dr < height and 0 <= c + dc < width:
+                    mask |= 1 << (r + dr + (c + dc) * height)
+            masks.append(mask)
+        _KNIGHT_TABLES[key] = (tuple(masks), coordinates, {})
+    return _KNIGHT_TABLES[key]
+
+
+class BitBoard(Board):
+    """A Board that keeps the blocked cells as the bits of one integer.
+
+    The public API is the one of `Board`, so agents can search either one.
+    Legal knight moves are the precomputed move mask of the player's cell
+    with the blocked cells masked out, read back with a bit scan, and
+    `copy()` only copies a few attributes instead of a list of every cell.
+
+    Parameters
+    ----------
+    player_1 : object
+        An object with a get_move() function. This is the only function
+        directly called by the Board class for each player.
+
+    player_2 : object
+        An object with a get_move() function. This is the only function
+        directly called by the Board class for each player.
+
+    width : int (optional)
+        The number of columns that the board should have.
+
+    height : int (optional)
+        The number of rows that the board should have.
+    """
+
+    def __init__(self, player_1, player_2, width=7, height=7):
+        self.width = width
+        self.height = height
+        self.move_count = 0
+        self._player_1 = player_1
+        self._player_2 = player_2
+        self._active_player = player_1
+        self._inactive_player = player_2
+
+        self._knight_masks, self._coordinates, self._move_cells = _knight_tables(width, height)
+        self._full = (1 << (width * height)) - 1
+        # Bit idx is set once cell idx has been occupied
+        self._blocked = 0
+        # Cell index of player 1 and player 2, or NOT_MOVED
+        self._locations = (Board.NOT_MOVED, Board.NOT_MOVED)
+        # 0 while player 1 holds the initiative, 1 for player 2
+        self._initiative = 0
+        # (blocked, locations, hash) before every pushed move
+        self._undo = []
+        # Zobrist hash of the state, equal to the hash of a Board in the same state
+        self._zobrist = _zobrist_keys(width, height)
+        self._hash = 0
+
+    @classmethod
+    def from_board(cls, board):
+        """Return a BitBoard of the same game state as a list based Board."""
+        new_board = cls(board._player_1, board._player_2, width=board.width, height=board.height)
+        new_board.move_count = board.move_count
+        new_board._active_player = board._active_player
+        new_board._inactive_player = board._inactive_player
+        state = board._board_state
+        new_board._blocked = sum(1 << idx for idx in range(board.width * board.height) if state[idx])
+        new_board._locations = (state[-1], state[-2])
+        new_board._initiative = state[-3]
+        new_board._hash = board._hash
+        return new_board
+
+    def hash(self):
+        """Return the Zobrist hash of the blocked cells, the player locations
+        and the initiative, kept up to date by every move.
+        """
+        return self._hash
+
+    def copy(self):
+        """ Return a deep copy of the current board. """
+        new_board = BitBoard.__new__(BitBoard)
+        new_board.__dict__ = state = self.__dict__.copy()
+        state['_undo'] = self._undo[:]
+        return new_board
+
+    def move_is_legal(self, move):
+        """Test whether a move is legal in the current game state.
+
+        Parameters
+        ----------
+        move : (int, int)
+            A coordinate pair (row, column) indicating the next position for
+            the active player on the board.
+
+        Returns
+        -------
+        bool
+            Returns True if the move is legal, False otherwise
+        """
+        return (0 <= move[0] < self.height and 0 <= move[1] < self.width and
+                not self._blocked >> (move[0] + move[1] * self.height) & 1)
+
+    def get_blank_spaces(self):
+        """Return a list of the locations that are still available on the board.
+        """
+        return self.__cells(self._full & ~self._blocked)
+
+    def get_player_location(self, player):
+        """Find the current location of the specified player on the board.
+
+        Parameters
+        ----------
+        player : object
+            An object registered as a player in the current game.
+
+        Returns
+        -------
+        (int, int) or None
+            The coordinate pair (row, column) of the input player, or None
+            if the player has not moved.
+        """
+        if player == self._player_1:
+            idx = self._locations[0]
+        elif player == self._player_2:
+            idx = self._locations[1]
+        else:
+            raise RuntimeError(
+                "Invalid player in get_player_location: {}".format(player))
+        if idx == Board.NOT_MOVED:
+            return Board.NOT_MOVED
+        return self._coordinates[idx]
+
+    def get_legal_moves(self, player=None):
+        """Return the list of all legal moves for the specified player.
+
+        Parameters
+        ----------
+        player : object (optional)
+            An object registered as a player in the current game. If None,
+            return the legal moves for the active player on the board.
+
+        Returns
+        -------
+        list<(int, int)>
+            The list of coordinate pairs (row, column) of all legal moves
+            for the player constrained by the current game state.
+        """
+        if player is None:
+            player = self._active_player
+        if player == self._player_1:
+            idx = self._locations[0]
+        elif player == self._player_2:
+            idx = self._locations[1]
+        else:
+            raise RuntimeError(
+                "Invalid player in get_legal_moves: {}".format(player))
+        if idx == Board.NOT_MOVED:
+            return self.get_blank_spaces()
+        mask = self._knight_masks[idx] & ~self._blocked
+        cells = self._move_cells.get(mask)
+        if cells is None:
+            cells = self._move_cells[mask] = tuple(self.__cells(mask))
+        valid_moves = list(cells)
+        random.shuffle(valid_moves)
+        return valid_moves
+
+    def is_winner(self, player):
+        """ Test whether the specified player has won the game. """
+        return player == self._inactive_player and not self.__move_mask(self._active_player)
+
+    def is_loser(self, player):
+        """ Test whether the specified player has lost the game. """
+        return player == self._active_player and not self.__move_mask(self._active_player)
+
+    def utility(self, player):
+        """Returns the utility of the current game state from the perspective
+        of the specified player: +inf if the player has won, -inf if the
+        player has lost and 0 otherwise.
+        """
+        if not self.__move_mask(self._active_player):
+
+            if player == self._inactive_player:
+                return float("inf")
+
+            if player == self._active_player:
+                return float("-inf")
+
+        return 0.
+
+    def apply_move(self, move):
+        """Move the active player to a specified location.
+
+        Parameters
+        ----------
+        move : (int, int)
+            A coordinate pair (row, column) indicating the next position for
+            the active player on the board.
+        """
+        idx = move[0] + move[1] * self.height
+        bit = 1 << idx
+        blocked_keys, location_keys, initiative_key = self._zobrist
+        if self._active_player == self._player_2:
+            last_move = self._locations[1]
+            keys = location_keys[1]
+            self._locations = (self._locations[0], idx)
+        else:
+            last_move = self._locations[0]
+            keys = location_keys[0]
+            self._locations = (idx, self._locations[1])
+        self._hash ^= initiative_key ^ keys[idx]
+        if last_move != Board.NOT_MOVED:
+            self._hash ^= keys[last_move]
+        if not self._blocked & bit:
+            self._hash ^= blocked_keys[idx]
+        self._blocked |= bit
+        self._initiative ^= 1
+        self._active_player, self._inactive_player = self._inactive_player, self._active_player
+        self.move_count += 1
+
+    def push_move(self, move):
+        """Apply a move in place so that pop_move() can take it back, see
+        Board.push_move().
+        """
+        self._undo.append((self._blocked, self._locations, self._hash))
+        self.apply_move(move)
+
+    def pop_move(self):
+        """Take back the last move applied by push_move(), see Board.pop_move().
+        """
+        if not self._undo:
+            raise RuntimeError("pop_move() called without a matching push_move()")
+        self._blocked, self._locations, self._hash = self._undo.pop()
+        self._initiative ^= 1
+        self._active_player, self._inactive_player = self._inactive_player, self._active_player
+        self.move_count -= 1
+
+    def __move_mask(self, player):
+        """Return the mask of the cells the specified player can move to."""
+        if player == self._player_1:
+            idx = self._locations[0]
+        elif player == self._player_2:
+            idx = self._locations[1]
+        else:
+            raise RuntimeError("Invalid player: {}".format(player))
+        if idx == Board.NOT_MOVED:
+            return self._full & ~self._blocked
+        return self._knight_masks[idx] & ~self._blocked
+
+    def __cells(self, mask):
+        """Return the (row, column) coordinates of the set bits of a mask."""
+        coordinates = self._coordinates
+        cells = []
+        while mask:
+            bit = mask & -mask
+            cells.append(coordinates[bit.bit_length() - 1])
+            mask ^= bit
+        return cells
+
+    def to_string(self, symbols=['1', '2']):
+        """Generate a string representation of the current game state, marking
+        the location of each player and indicating which cells have been
+        blocked, and which remain open.
+        """
+        p1_loc, p2_loc = self._locations
+
+        col_margin = len(str(self.height - 1)) + 1
+        prefix = "{:<" + "{}".format(col_margin) + "}"
+        offset = " " * (col_margin + 3)
+        out = offset + '   '.join(map(str, range(self.width))) + '\n\r'
+        for i in range(self.height):
+            out += prefix.format(i) + ' | '
+            for j in range(self.width):
+                idx = i + j * self.height
+                if not self._blocked >> idx & 1:
+                    out += ' '
+                elif p1_loc == idx:
+                    out += symbols[0]
+                elif p2_loc == idx:
+                    out += symbols[1]
+                else:
+                    out += '-'
+                out += ' | '
+            out += '\n\r'
+
+        return out
@@ -3,6 +3,7 @@ tests to run and debug your minimax and alphabeta agents locally.  The test
 cases used by the project assistant are not public.
 """
 
+import random
 import unittest
 
 import isolation
@@ -25,5 +26,127 @@ class IsolationTest(unittest.TestCase):
         self.fail("Hello, World!")
 
 
+
+class BitBoardTest(unittest.TestCase):
+    """BitBoard must play exactly like the list based Board"""
+
+    def check_same(self, board, bitboard):
+        self.assertEqual(board.to_string(), bitboard.to_string())
+        self.assertEqual(board.active_player, bitboard.active_player)
+        self.assertEqual(board.move_count, bitboard.move_count)
+        self.assertEqual(sorted(board.get_blank_spaces()), sorted(bitboard.get_blank_spaces()))
+        for player in ("Player1", "Player2"):
+            self.assertEqual(board.get_player_location(player), bitboard.get_player_location(player))
+            self.assertEqual(sorted(board.get_legal_moves(player)), sorted(bitboard.get_legal_moves(player)))
+            self.assertEqual(board.utility(player), bitboard.utility(player))
+            self.assertEqual(board.is_winner(player), bitboard.is_winner(player))
+            self.assertEqual(board.is_loser(player), bitboard.is_loser(player))
+
+    def test_random_games(self):
+        rnd = random.Random(0)
+        for width, height in ((7, 7), (5, 8)):
+            board = isolation.Board("Player1", "Player2", width, height)
+            bitboard = isolation.BitBoard("Player1", "Player2", width, height)
+            while True:
+                self.check_same(board, bitboard)
+                self.check_same(board, isolation.BitBoard.from_board(board))
+                moves = board.get_legal_moves()
+                if not moves:
+                    break
+                move = rnd.choice(moves)
+                self.assertTrue(bitboard.move_is_legal(move))
+                board.apply_move(move)
+                bitboard = bitboard.forecast_move(move)
+            self.assertFalse(bitboard.move_is_legal((0, width)))
+
+    def test_copy_is_independent(self):
+        bitboard = isolation.BitBoard("Player1", "Player2")
+        bitboard.apply_move((3, 3))
+        child = bitboard.forecast_move((0, 0))
+        self.assertEqual(bitboard.get_player_location("Player2"), None)
+        self.assertEqual(child.get_player_location("Player2"), (0, 0))
+        self.assertTrue(bitboard.move_is_legal((0, 0)))
+        self.assertNotEqual(bitboard.hash(), child.hash())
+
+
+
+class PushPopTest(unittest.TestCase):
+    """push_move() and pop_move() must restore the exact prior state"""
+
+    def state(self, board):
+        return (board.to_string(), board.hash(), board.move_count, board.active_player,
+                board.inactive_player, board.get_player_location("Player1"),
+                board.get_player_location("Player2"), sorted(board.get_legal_moves()))
+
+    def test_restore(self):
+        rnd = random.Random(1)
+        for cls in (isolation.Board, isolation.BitBoard):
+            board = cls("Player1", "Player2")
+            states = []
+            for _ in range(200):
+                moves = board.get_legal_moves()
+                if moves and (not states or rnd.random() < 0.6):
+                    states.append(self.state(board))
+                    board.push_move(rnd.choice(moves))
+                elif states:
+                    board.pop_move()
+                    self.assertEqual(self.state(board), states.pop())
+            while states:
+                board.pop_move()
+                self.assertEqual(self.state(board), states.pop())
+            with self.assertRaises(RuntimeError):
+                board.pop_move()
+
+    def test_search_leaves_board_unchanged(self):
+        for cls in (isolation.Board, isolation.BitBoard):
+            player = game_agent.AlphaBetaPlayer(search_depth=3)
+            player.time_left = lambda: 1000.
+            board = cls(player, game_agent.AlphaBetaPlayer())
+            board.apply_move((2, 3))
+            board.apply_move((0, 5))
+            before = board.to_string()
+            self.assertIn(player.alphabeta(board, 3), board.get_legal_moves())
+            self.assertEqual(board.to_string(), before)
+            self.assertEqual(board.move_count, 2)
+
+
+
+class ZobristHashTest(unittest.TestCase):
+    """hash() must identify positions, whatever the move order and board type"""
+
+    def play(self, cls, moves):
+        board = cls("Player1", "Player2")
+        for move in moves:
+            board.apply_move(move)
+        return board
+
+    def test_transposition(self):
+        # Both players end on the same cells with the same cells blocked
+        first = [(0, 0), (3, 3), (1, 2), (2, 1)]
+        second = [(3, 3), (0, 0), (1, 2), (2, 1)]
+        for cls in (isolation.Board, isolation.BitBoard):
+            self.assertEqual(self.play(cls, first).hash(), self.play(cls, second).hash())
+            self.assertEqual(self.play(cls, first).hash(), self.play(isolation.Board, first).hash())
+            self.assertNotEqual(self.play(cls, first).hash(), self.play(cls, first[:3]).hash())
+            self.assertNotEqual(self.play(cls, first[:2]).hash(), self.play(cls, second[:2]).hash())
+
+    def test_incremental(self):
+        rnd = random.Random(2)
+        board = isolation.Board("Player1", "Player2")
+        bitboard = isolation.BitBoard("Player1", "Player2")
+        hashes = set()
+        while board.get_legal_moves():
+            move = rnd.choice(board.get_legal_moves())
+            board.push_move(move)
+            bitboard.apply_move(move)
+            self.assertEqual(board.hash(), bitboard.hash())
+            self.assertEqual(board.hash(), isolation.BitBoard.from_board(board).hash())
+            self.assertNotIn(board.hash(), hashes)
+            hashes.add(board.hash())
+        while board.move_count:
+            board.pop_move()
+        self.assertEqual(board.hash(), isolation.Board("Player1", "Player2").hash())
+
+
 if __name__ == '__main__':
     unittest.main()